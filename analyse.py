@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import OrderedDict, deque
+
+import engine
+from bitboard import pdn_notation
+from movelog import parse_pdn
+
+# Bulk analysis of recorded games: every position of every game searched by
+# the engine and written out with its score and the best move.
+#
+#   python analyse.py games.pdn -o analysis.jsonl --depth 6 --jobs 4
+#
+# The input holds one game per line: PDN movetext, optionally with its tag
+# pairs on the same line ("-" reads stdin). Each game becomes one JSON line,
+# in input order and numbered by input line:
+#   {"line": 1, "tags": {...}, "plies": [{"ply": 1, "move": "11-15",
+#    "best": "11-15", "score": 0.1, "depth": 6}, ...]}
+# or {"line": 1, "error": "..."} for a line that is not a legal game.
+# "score" and "best" are the engine's for the position before "move", the
+# score from WHITE's point of view.
+#
+# Input is read as it is needed and each game is written as soon as its
+# positions are done, so memory does not grow with the input. Positions go
+# to a pool of engine processes, a bounded number of them at a time.
+# Positions seen before (the openings of most games) are answered from a
+# cache of the last --cache results, or share the search already running.
+
+CACHE_SIZE = 200000  # Results kept for positions that recur across games
+WINDOW = 256         # Positions in the pool and games waiting to be written, at most
+
+
+class ResultCache:
+    # (move, score, depth) by Zobrist key, forgetting the least recently
+    # used entries past `size`.
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        result = self.entries.get(key)
+        if result is not None:
+            self.entries.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+class Analysis:
+
+    def __init__(self, executor, out, depth=6, ai='alphabeta', batched=False,
+                 cache_size=CACHE_SIZE, window=WINDOW, log=None):
+        self.executor = executor
+        self.out = out
+        self.depth = depth
+        self.ai_type = engine.AI_TYPES[ai]
+        self.batched = batched
+        self.window = window
+        self.log = log
+        self.cache = ResultCache(cache_size)
+        self.running = {}       # key -> Future of positions in the pool
+        self.pending = deque()  # games read but not yet written, in order
+        self.games = 0
+        self.positions = 0
+        self.searched = 0
+        self.start = time.perf_counter()
+
+    def add(self, number, line):
+        try:
+            tags, moves = parse_pdn(line)
+        except ValueError as e:
+            self.pending.append((number, None, str(e)))
+        else:
+            self.pending.append((number, tags, self._submit(moves)))
+        while self.pending and (len(self.running) > self.window or len(self.pending) > self.window
+                                or self._ready(self.pending[0])):
+            self._write(self.pending.popleft())
+
+    def finish(self):
+        while self.pending:
+            self._write(self.pending.popleft())
+        self.out.flush()
+
+    def _submit(self, moves):
+        # (move, result) per ply, result being a cached tuple or a Future.
+        plies = []
+        position = engine.Position()
+        for move in moves:
+            key = position.key
+            result = self.cache.get(key) or self.running.get(key)
+            if result is None:
+                result = self.executor.submit(engine.search_in_worker, position, self.ai_type,
+                                              None, self.batched, self.depth)
+                self.running[key] = result
+                self.searched += 1
+            plies.append((key, move, result))
+            position = position.play(move)
+        self.positions += len(plies)
+        return plies
+
+    def _ready(self, game):
+        plies = game[2]
+        return isinstance(plies, str) or all(
+            isinstance(result, tuple) or result.done() for _, _, result in plies)
+
+    def _write(self, game):
+        number, tags, plies = game
+        if tags is None:
+            record = {'line': number, 'error': plies}
+        else:
+            annotated = []
+            for ply, (key, move, result) in enumerate(plies, 1):
+                if not isinstance(result, tuple):
+                    best, score, depth, _ = result.result()
+                    result = (best, score, depth)
+                    self.cache.put(key, result)
+                    self.running.pop(key, None)
+                best, score, depth = result
+                annotated.append({'ply': ply, 'move': pdn_notation(move),
+                                  'best': pdn_notation(best) if best else None,
+                                  'score': score, 'depth': depth})
+            record = {'line': number, 'tags': tags, 'plies': annotated}
+        self.out.write(json.dumps(record) + '\n')
+        self.games += 1
+        if self.log and self.games % 100 == 0:
+            self.log(self.summary())
+
+    def summary(self):
+        seconds = time.perf_counter() - self.start
+        hits = self.positions - self.searched
+        return (f"{self.games} games, {self.positions} positions "
+                f"({self.positions / seconds if seconds else 0:,.0f}/s), "
+                f"{self.searched} searched, {hits / (self.positions or 1):.0%} repeats")
+
+
+def analyse_file(lines, out, jobs=1, depth=6, ai='alphabeta', batched=False, table_mb=16,
+                 tablebase_path=None, cache_size=CACHE_SIZE, log=None):
+    # Analyses every game in `lines` into `out`; returns the Analysis with
+    # its counters.
+    executor = engine.make_pool(jobs, table_mb, tablebase_path)
+    # Enough positions in flight to keep every worker busy
+    analysis = Analysis(executor, out, depth, ai, batched, cache_size,
+                        max(WINDOW, jobs * 64), log)
+    try:
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if line and not line.startswith('#'):
+                analysis.add(number, line)
+        analysis.finish()
+    finally:
+        executor.shutdown(cancel_futures=True)
+    return analysis
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Annotate recorded checkers games with engine scores.")
+    parser.add_argument('input', help="one PDN game per line, or - for stdin")
+    parser.add_argument('-o', '--output', default='-', help="JSON lines output (default stdout)")
+    parser.add_argument('--depth', type=int, default=6, help="search depth per position")
+    parser.add_argument('--ai', choices=['alphabeta', 'pvs'], default='alphabeta')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--cache', type=int, default=CACHE_SIZE, help="results kept for repeated positions")
+    parser.add_argument('--table-mb', type=int, default=16, help="transposition table size per worker")
+    parser.add_argument('--tablebase', default='endgame.tb')
+    parser.add_argument('--batched', action=argparse.BooleanOptionalAction, default=False,
+                        help="use the NumPy batched evaluation (slower per position)")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == '-' else open(args.input)
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        analysis = analyse_file(source, out, args.jobs, args.depth, args.ai, args.batched,
+                                args.table_mb, args.tablebase, args.cache,
+                                log=lambda message: print(message, file=sys.stderr))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    print(analysis.summary(), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+import argparse
+import json
+import platform
+import sys
+import time
+
+import engine
+from bitboard import Position, WHITE, RED, square, move_squares
+from evaluation import HAVE_NUMPY
+from transposition import TranspositionTable
+
+# Move generator and search benchmarks over a fixed set of positions.
+#
+#   python benchmark.py perft --depth 6 --verify
+#   python benchmark.py search --depth 6 --json results.json
+#
+# Diagrams list rows 0-7 top to bottom: w/W = white man/king, r/R = red
+# man/king, '.' = empty dark square, ' ' or '-' = light square.
+
+POSITIONS = {
+    'opening': ("""
+        -w-w-w-w
+        w-w-w-w-
+        -w-w-w-w
+        --------
+        --------
+        r-r-r-r-
+        -r-r-r-r
+        r-r-r-r-
+    """, RED),
+    'opening-exchange': ("""
+        -w-w-w-w
+        w-w-w-w-
+        -.-w-w-w
+        --w-----
+        ---r----
+        r-.-r-r-
+        -r-r-r-r
+        r-r-r-r-
+    """, WHITE),
+    'middlegame': ("""
+        -w-.-w-.
+        w-.-w-.-
+        -.-w-w-.
+        w-.-r-.-
+        -r-.-.-w
+        r-.-.-r-
+        -.-r-r-.
+        r-.-.-r-
+    """, RED),
+    'multi-jump': ("""
+        -.-.-.-.
+        .-.-w-.-
+        -.-.-.-.
+        .-w-w-.-
+        -.-.-.-.
+        w-w-.-.-
+        -r-.-.-.
+        .-.-r-.-
+    """, RED),
+    'kings-endgame': ("""
+        -.-.-.-.
+        .-.-W-.-
+        -.-.-.-.
+        .-.-.-.-
+        -.-W-.-.
+        .-R-.-.-
+        -.-.-R-.
+        .-.-.-.-
+    """, WHITE),
+    'king-vs-men': ("""
+        -.-.-.-.
+        w-.-.-.-
+        -.-w-.-.
+        .-.-.-.-
+        -.-.-.-W
+        .-.-R-.-
+        -r-.-.-.
+        .-.-r-.-
+    """, RED),
+}
+
+# Perft counts (depth 1, 2, ...) for the positions above, from the bitboard
+# move generator after cross-checking it against Board.get_valid_moves.
+PERFT = {
+    'opening': [7, 49, 379, 2872, 23582, 190647],
+    'opening-exchange': [7, 53, 420, 3390, 27990, 233414],
+    'middlegame': [9, 85, 678, 6126, 47489, 432381],
+    'multi-jump': [6, 38, 137, 768, 2407, 13297],
+    'kings-endgame': [8, 62, 429, 2902, 19232, 122665],
+    'king-vs-men': [8, 40, 275, 1637, 10775, 64781],
+}
+
+
+def parse_diagram(diagram, turn):
+    white = red = kings = 0
+    rows = [line.strip() for line in diagram.strip().splitlines()]
+    for row, line in enumerate(rows):
+        for col, char in enumerate(line):
+            if char in '-. ':
+                continue
+            if col % 2 != (row + 1) % 2:
+                raise ValueError(f"Piece on a light square at row {row}, col {col}")
+            b = 1 << square(row, col)
+            if char in 'wW':
+                white |= b
+            elif char in 'rR':
+                red |= b
+            else:
+                raise ValueError(f"Unknown piece '{char}' in diagram")
+            if char in 'WR':
+                kings |= b
+    return Position(white, red, kings, turn)
+
+def positions(names=None):
+    return {name: parse_diagram(*POSITIONS[name]) for name in (names or POSITIONS)}
+
+
+def perft(position, depth):
+    if depth == 0:
+        return 1
+    moves = position.get_moves()
+    if depth == 1:
+        return len(moves)
+    return sum(perft(position.play(move), depth - 1) for move in moves)
+
+def board_moves(board, color):
+    # {(from, to): [captured squares, ...]} through Board.get_valid_moves.
+    moves = {}
+    for piece in board.get_all_pieces(color):
+        for (row, col), skipped in board.get_valid_moves(piece).items():
+            moves[(piece.row, piece.col), (row, col)] = sorted((p.row, p.col) for p in skipped)
+    return moves
+
+def verify_moves(position, depth, mismatches):
+    # Walk the bitboard perft tree and compare every node's moves with the
+    # Board generator (multi-jump traversal included). Board keys moves by
+    # destination, so when two capture chains land on the same square it
+    # keeps one of them; that chain must be one the bitboard also found.
+    chains = {}
+    for move in position.get_moves():
+        src, dst, captured = move_squares(move)
+        chains.setdefault((src, dst), []).append(sorted(captured))
+    expected = board_moves(position.to_board(), position.color())
+    if set(expected) != set(chains) or any(expected[k] not in chains[k] for k in expected):
+        mismatches.append(position)
+    checked = 1
+    if depth > 1:
+        for move in position.get_moves():
+            checked += verify_moves(position.play(move), depth - 1, mismatches)
+    return checked
+
+def run_perft(depth, names=None, verify=False):
+    results = []
+    for name, position in positions(names).items():
+        for d in range(1, depth + 1):
+            start = time.perf_counter()
+            nodes = perft(position, d)
+            elapsed = time.perf_counter() - start
+            result = {'position': name, 'depth': d, 'nodes': nodes, 'seconds': elapsed,
+                      'nodes_per_second': nodes / elapsed if elapsed else 0.0}
+            if verify:
+                mismatches = []
+                expected = PERFT.get(name, [])
+                result['checked'] = verify_moves(position, d, mismatches)
+                result['mismatches'] = [repr(p) for p in mismatches[:10]]
+                result['ok'] = not mismatches and (d > len(expected) or expected[d - 1] == nodes)
+            results.append(result)
+    return results
+
+
+SEARCHES = {'minimax': engine.minimax, 'alphabeta': engine.alphabeta, 'pvs': engine.aspiration}
+if HAVE_NUMPY:
+    SEARCHES['batched'] = engine.batched_alphabeta
+
+def run_search(depth, names=None, algorithms=('minimax', 'alphabeta'), table_mb=64):
+    # Time-to-depth: each algorithm deepens 1..depth on a fresh context (and
+    # transposition table for alpha-beta), reporting cumulative time and nodes.
+    results = []
+    for name, position in positions(names).items():
+        for algorithm in algorithms:
+            table = TranspositionTable(table_mb) if algorithm != 'minimax' else None
+            context = engine.SearchContext(table)
+            start = time.perf_counter()
+            for d in range(1, depth + 1):
+                score, move = SEARCHES[algorithm](position, d, context=context)
+                elapsed = time.perf_counter() - start
+                results.append({
+                    'position': name, 'algorithm': algorithm, 'depth': d,
+                    'score': score, 'nodes': context.stats.nodes, 'seconds': elapsed,
+                    'nodes_per_second': context.stats.nodes / elapsed if elapsed else 0.0,
+                })
+    return results
+
+
+def _environment():
+    return {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+            'machine': platform.machine(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft and search benchmarks for the checkers engine.")
+    parser.add_argument('mode', choices=('perft', 'search'))
+    parser.add_argument('--depth', type=int, default=5)
+    parser.add_argument('--position', action='append', choices=sorted(POSITIONS),
+                        help="restrict to these positions (repeatable)")
+    parser.add_argument('--algorithm', action='append', choices=sorted(SEARCHES),
+                        help="search mode only; default: all")
+    parser.add_argument('--verify', action='store_true',
+                        help="perft mode: cross-check against Board and known counts")
+    parser.add_argument('--json', metavar='FILE', help="write results to FILE as JSON")
+    args = parser.parse_args(argv)
+
+    if args.mode == 'perft':
+        results = run_perft(args.depth, args.position, args.verify)
+    else:
+        results = run_search(args.depth, args.position, args.algorithm or tuple(SEARCHES))
+
+    if args.json:
+        report = {'mode': args.mode, 'environment': _environment(), 'results': results}
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        for r in results:
+            label = r['position'] if args.mode == 'perft' else f"{r['position']} {r['algorithm']}"
+            line = (f"{label:28} depth {r['depth']:2}  {r['nodes']:>10} nodes  "
+                    f"{r['seconds']:8.3f}s  {r['nodes_per_second']:>12,.0f} nodes/s")
+            if 'ok' in r:
+                line += "  ok" if r['ok'] else f"  MISMATCH {r['mismatches'][:1]}"
+            print(line)
+
+    return 1 if any(r.get('ok') is False for r in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
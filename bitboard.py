@@ -0,0 +1,334 @@
+import random
+from checkers import Constants, Board, Piece, PIECE_SQUARE
+
+# Engine-side position representation.
+#
+# Only the 32 dark squares are playable, so a position fits in three 32-bit
+# masks (white pieces, red pieces, kings) plus the side to move. Square
+# s = row * 4 + col // 2, i.e. row 0 holds squares 0-3 and row 7 holds 28-31.
+# WHITE starts on rows 0-2 and moves down the board (towards higher squares),
+# RED starts on rows 5-7 and moves up.
+
+WHITE = 0
+RED = 1
+
+SQUARES = 32
+FULL = 0xFFFFFFFF
+EVEN_ROWS = 0x0F0F0F0F    # rows 0, 2, 4, 6 (dark squares on odd columns)
+ODD_ROWS = 0xF0F0F0F0     # rows 1, 3, 5, 7 (dark squares on even columns)
+LEFT_EDGE = 0x10101010    # column 0
+RIGHT_EDGE = 0x08080808   # column 7
+WHITE_KING_ROW = 0xF0000000
+RED_KING_ROW = 0x0000000F
+WHITE_START = 0x00000FFF
+RED_START = 0xFFF00000
+
+
+# Whole-mask diagonal shifts. Dark squares are staggered, so the shift
+# distance depends on the parity of the row the piece stands on.
+def down_left(b):
+    return (((b & EVEN_ROWS) << 4) | ((b & ODD_ROWS & ~LEFT_EDGE) << 3)) & FULL
+
+def down_right(b):
+    return (((b & EVEN_ROWS & ~RIGHT_EDGE) << 5) | ((b & ODD_ROWS) << 4)) & FULL
+
+def up_left(b):
+    return ((b & EVEN_ROWS) >> 4) | ((b & ODD_ROWS & ~LEFT_EDGE) >> 5)
+
+def up_right(b):
+    return ((b & EVEN_ROWS & ~RIGHT_EDGE) >> 3) | ((b & ODD_ROWS) >> 4)
+
+UP = (up_left, up_right)
+DOWN = (down_left, down_right)
+
+
+def square(row, col):
+    return row * 4 + col // 2
+
+def row_col(sq):
+    row = sq // 4
+    return row, (sq % 4) * 2 + (1 - row % 2)
+
+def bit_to_square(b):
+    return b.bit_length() - 1
+
+def bits(mask):
+    while mask:
+        b = mask & -mask
+        yield b
+        mask ^= b
+
+
+# Per-square step and jump tables built from the shifts above, keyed by the
+# single-bit mask of the origin square. A value of 0 means off the board.
+def _step_table(shift):
+    return {1 << s: shift(1 << s) for s in range(SQUARES)}
+
+def _jump_table(shift):
+    return {1 << s: shift(shift(1 << s)) for s in range(SQUARES)}
+
+STEPS = {UP: tuple(_step_table(f) for f in UP),
+         DOWN: tuple(_step_table(f) for f in DOWN)}
+JUMPS = {UP: tuple(zip(STEPS[UP], (_jump_table(f) for f in UP))),
+         DOWN: tuple(zip(STEPS[DOWN], (_jump_table(f) for f in DOWN)))}
+
+
+# Zobrist keys: one random 64-bit number per (piece kind, square), keyed by
+# the square's bit, plus one for WHITE to move. Seeded so keys are stable
+# between runs and processes.
+WHITE_MAN, WHITE_KING, RED_MAN, RED_KING = range(4)
+_rng = random.Random(0x5EED)
+ZOBRIST = tuple({1 << s: _rng.getrandbits(64) for s in range(SQUARES)} for _ in range(4))
+ZOBRIST_WHITE_TO_MOVE = _rng.getrandbits(64)
+del _rng
+
+# The piece-square tables of checkers.PIECE_SQUARE by piece kind, keyed by
+# the square's bit like ZOBRIST. A Position carries the sum over its pieces,
+# updated by play() alongside the Zobrist key.
+def _square_values(color, king):
+    table = PIECE_SQUARE[color, king]
+    return {1 << s: table[row][col] for s, (row, col) in enumerate(map(row_col, range(SQUARES)))}
+
+SQUARE_VALUE = (_square_values(Constants.WHITE, False), _square_values(Constants.WHITE, True),
+                _square_values(Constants.RED, False), _square_values(Constants.RED, True))
+
+def zobrist(white, red, kings, turn):
+    key = ZOBRIST_WHITE_TO_MOVE if turn == WHITE else 0
+    for mask, kind in ((white & ~kings, WHITE_MAN), (white & kings, WHITE_KING),
+                       (red & ~kings, RED_MAN), (red & kings, RED_KING)):
+        table = ZOBRIST[kind]
+        for b in bits(mask):
+            key ^= table[b]
+    return key
+
+def square_score(white, red, kings):
+    score = 0
+    for mask, kind in ((white & ~kings, WHITE_MAN), (white & kings, WHITE_KING),
+                       (red & ~kings, RED_MAN), (red & kings, RED_KING)):
+        table = SQUARE_VALUE[kind]
+        for b in bits(mask):
+            score += table[b]
+    return score
+
+
+class Position:
+    __slots__ = ('white', 'red', 'kings', 'turn', 'key', 'score')
+
+    def __init__(self, white=WHITE_START, red=RED_START, kings=0, turn=RED, key=None, score=None):
+        self.white = white
+        self.red = red
+        self.kings = kings
+        self.turn = turn
+        # Zobrist key and piece-square score; play() passes them in already
+        # updated for the move.
+        self.key = zobrist(white, red, kings, turn) if key is None else key
+        self.score = square_score(white, red, kings) if score is None else score
+
+    def __eq__(self, other):
+        return (isinstance(other, Position) and self.white == other.white and
+                self.red == other.red and self.kings == other.kings and
+                self.turn == other.turn)
+
+    def __hash__(self):
+        return self.key
+
+    def __repr__(self):
+        return (f"Position(white={self.white:#010x}, red={self.red:#010x}, "
+                f"kings={self.kings:#010x}, turn={'WHITE' if self.turn == WHITE else 'RED'})")
+
+    @classmethod
+    def from_board(cls, board, color):
+        white = red = kings = 0
+        for row in board.board:
+            for piece in row:
+                if piece is None:
+                    continue
+                b = 1 << square(piece.row, piece.col)
+                if piece.color == Constants.WHITE:
+                    white |= b
+                else:
+                    red |= b
+                if piece.king:
+                    kings |= b
+        return cls(white, red, kings, WHITE if color == Constants.WHITE else RED)
+
+    def to_board(self):
+        board = Board()
+        board.board = [[None] * Constants.COLS for _ in range(Constants.ROWS)]
+        for mask, color in ((self.white, Constants.WHITE), (self.red, Constants.RED)):
+            for b in bits(mask):
+                row, col = row_col(bit_to_square(b))
+                piece = Piece(row, col, color)
+                if b & self.kings:
+                    piece.make_king()
+                board.board[row][col] = piece
+        board.white_left = self.white.bit_count()
+        board.red_left = self.red.bit_count()
+        board.white_kings = (self.white & self.kings).bit_count()
+        board.red_kings = (self.red & self.kings).bit_count()
+        board.score = self.score
+        return board
+
+    def color(self):
+        return Constants.WHITE if self.turn == WHITE else Constants.RED
+
+    def _sides(self, side):
+        if side == WHITE:
+            return self.white, self.red, DOWN, UP
+        return self.red, self.white, UP, DOWN
+
+    def get_moves(self, captures_only=False):
+        # Moves are (from_bit, to_bit, captured_mask). As in
+        # Board.get_valid_moves, captures are optional, every landing square
+        # of a jump chain is a legal stopping point, and a chain keeps the
+        # vertical direction of its first jump.
+        own, opp, forward, backward = self._sides(self.turn)
+        empty = FULL & ~(own | opp)
+        moves = []
+        for direction, movers in ((forward, own), (backward, own & self.kings)):
+            if not movers:
+                continue
+            steps = STEPS[direction]
+            jumps = JUMPS[direction]
+            for src in bits(movers):
+                if not captures_only:
+                    for table in steps:
+                        dst = table[src]
+                        if dst & empty:
+                            moves.append((src, dst, 0))
+                stack = [(src, 0)]
+                while stack:
+                    at, captured = stack.pop()
+                    for over_table, land_table in jumps:
+                        over = over_table[at]
+                        if over & opp:
+                            land = land_table[at]
+                            if land & empty:
+                                moves.append((src, land, captured | over))
+                                stack.append((land, captured | over))
+        return moves
+
+    def get_quiet_moves(self):
+        # The non-capturing moves of get_moves(), in the same order, for
+        # searches that generate captures and quiet moves in separate stages.
+        own, opp, forward, backward = self._sides(self.turn)
+        empty = FULL & ~(own | opp)
+        moves = []
+        for direction, movers in ((forward, own), (backward, own & self.kings)):
+            steps = STEPS[direction]
+            for src in bits(movers):
+                for table in steps:
+                    dst = table[src]
+                    if dst & empty:
+                        moves.append((src, dst, 0))
+        return moves
+
+    def is_step(self, move):
+        # Whether move is a legal non-capturing move here, without generating
+        # any moves (e.g. a killer or transposition-table move).
+        src, dst, captured = move
+        own, opp, forward, backward = self._sides(self.turn)
+        if captured or not src & own or not dst & FULL & ~(own | opp):
+            return False
+        for direction in ((forward, backward) if src & self.kings else (forward,)):
+            for table in STEPS[direction]:
+                if table[src] == dst:
+                    return True
+        return False
+
+    def play(self, move):
+        src, dst, captured = move
+        kings = self.kings
+        if self.turn == WHITE:
+            man, king, opp_man, opp_king = WHITE_MAN, WHITE_KING, RED_MAN, RED_KING
+            promotion_row = WHITE_KING_ROW
+        else:
+            man, king, opp_man, opp_king = RED_MAN, RED_KING, WHITE_MAN, WHITE_KING
+            promotion_row = RED_KING_ROW
+        key = self.key ^ ZOBRIST_WHITE_TO_MOVE
+        if src & kings:
+            kings ^= src | dst
+            key ^= ZOBRIST[king][src] ^ ZOBRIST[king][dst]
+            score = self.score - SQUARE_VALUE[king][src] + SQUARE_VALUE[king][dst]
+        elif dst & promotion_row:
+            kings |= dst
+            key ^= ZOBRIST[man][src] ^ ZOBRIST[king][dst]
+            score = self.score - SQUARE_VALUE[man][src] + SQUARE_VALUE[king][dst]
+        else:
+            key ^= ZOBRIST[man][src] ^ ZOBRIST[man][dst]
+            score = self.score - SQUARE_VALUE[man][src] + SQUARE_VALUE[man][dst]
+        for b in bits(captured):
+            kind = opp_king if b & kings else opp_man
+            key ^= ZOBRIST[kind][b]
+            score -= SQUARE_VALUE[kind][b]
+        kings &= ~captured
+        if self.turn == WHITE:
+            return Position(self.white ^ (src | dst), self.red & ~captured, kings, RED, key, score)
+        return Position(self.white & ~captured, self.red ^ (src | dst), kings, WHITE, key, score)
+
+    def has_moves(self, side):
+        own, opp, forward, backward = self._sides(side)
+        empty = FULL & ~(own | opp)
+        for direction, movers in ((forward, own), (backward, own & self.kings)):
+            for shift in direction:
+                if shift(movers) & empty or shift(shift(movers) & opp) & empty:
+                    return True
+        return False
+
+    def has_captures(self):
+        # Whether the side to move has a capture, without generating moves.
+        own, opp, forward, backward = self._sides(self.turn)
+        empty = FULL & ~(own | opp)
+        for direction, movers in ((forward, own), (backward, own & self.kings)):
+            for shift in direction:
+                if shift(shift(movers) & opp) & empty:
+                    return True
+        return False
+
+    def winner(self):
+        if not self.red:
+            return Constants.WHITE
+        elif not self.white:
+            return Constants.RED
+        if not self.has_moves(RED):
+            return Constants.WHITE
+        elif not self.has_moves(WHITE):
+            return Constants.RED
+        return None
+
+    def evaluate(self):
+        # Same scale and terms as Board.evaluate
+        return self.score / 100
+
+
+def move_squares(move):
+    src, dst, captured = move
+    return (row_col(bit_to_square(src)), row_col(bit_to_square(dst)),
+            [row_col(bit_to_square(b)) for b in bits(captured)])
+
+def pdn_notation(move):
+    # PDN move notation, the one shown wherever moves are shown: "11-15" for
+    # a step, "15x22x29" for a capture chain. PDN numbers the squares 1-32
+    # from the side that moves first (RED, Black in PDN), so bitboard square
+    # s is 32 - s. The landing squares are rebuilt from the captured
+    # squares, which determine the path.
+    src, dst, captured = move
+    if not captured:
+        return f"{32 - bit_to_square(src)}-{32 - bit_to_square(dst)}"
+    path = [src]
+    remaining = captured
+    at = src
+    while remaining:
+        for over_table, land_table in JUMPS[UP] + JUMPS[DOWN]:
+            over = over_table[at]
+            if over & remaining and land_table[at]:
+                at = land_table[at]
+                remaining ^= over
+                path.append(at)
+                break
+        else:
+            path.append(dst)
+            break
+    if path[-1] != dst:
+        path.append(dst)
+    return "x".join(str(32 - bit_to_square(b)) for b in path)
@@ -0,0 +1,174 @@
+import argparse
+import mmap
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import engine
+from bitboard import Position, bit_to_square, pdn_notation
+from transposition import TranspositionTable
+
+# Opening book: a sorted file of fixed-width records, one per position,
+# memory-mapped and binary-searched at lookup time so any number of engine
+# processes can share it read-only.
+#
+#   python book.py build --plies 4 --depth 10 --jobs 4 -o opening.book
+#   python book.py info opening.book
+#
+# File layout: a header (magic, version, record size, record count)
+# followed by records sorted by Zobrist key:
+#   key (uint64), captured mask (uint32), from square, to square, depth
+#   (uint8 each), one pad byte, score (float32, WHITE's point of view).
+
+MAGIC = b'CKBK'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQ')
+RECORD = struct.Struct('<QIBBBxf')
+KEY = struct.Struct('<Q')
+
+
+class OpeningBook:
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise ValueError(f"{path} is not an opening book")
+        magic, version, record_size, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} opening book")
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def _record(self, index):
+        return RECORD.unpack_from(self._map, HEADER.size + index * RECORD.size)
+
+    def probe(self, position):
+        # Returns (move, score, depth) for position, or None if it is not in
+        # the book (or the stored move is not legal there, i.e. a key
+        # collision).
+        key = position.key
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_key, = KEY.unpack_from(self._map, HEADER.size + mid * RECORD.size)
+            if mid_key < key:
+                lo = mid + 1
+            elif mid_key > key:
+                hi = mid
+            else:
+                _, captured, src, dst, depth, score = self._record(mid)
+                move = (1 << src, 1 << dst, captured)
+                if move not in position.get_moves():
+                    return None
+                return move, score, depth
+        return None
+
+def open_book(path):
+    # The book is optional: a missing or unreadable file just means no book.
+    try:
+        return OpeningBook(path)
+    except (OSError, ValueError):
+        return None
+
+
+def write_book(path, entries):
+    # entries: iterable of (key, move, score, depth).
+    entries = sorted(entries, key=lambda entry: entry[0])
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(entries)))
+        for key, (src, dst, captured), score, depth in entries:
+            f.write(RECORD.pack(key, captured, bit_to_square(src), bit_to_square(dst),
+                                depth, score))
+
+def book_positions(plies, start=None):
+    # Every distinct position reachable within `plies` plies of the start.
+    start = start or Position()
+    frontier = {start.key: start}
+    found = dict(frontier)
+    for _ in range(plies):
+        following = {}
+        for position in frontier.values():
+            if position.winner() is not None:
+                continue
+            for move in position.get_moves():
+                child = position.play(move)
+                if child.key not in found:
+                    following[child.key] = child
+        found.update(following)
+        frontier = following
+    return [p for p in found.values() if p.winner() is None]
+
+def _analyse(args):
+    position, depth, time_limit, table_mb = args
+    table = TranspositionTable(table_mb)
+    context = engine.SearchContext(table)
+    if time_limit is not None:
+        score, move, depth = engine.iterative_deepening(position, time_limit, table=table,
+                                                        max_depth=depth, context=context)
+    else:
+        for d in range(1, depth + 1):
+            score, move = engine.alphabeta(position, d, context=context)
+    return position.key, move, score, depth
+
+def build_book(path, plies=4, depth=10, time_limit=None, jobs=1, table_mb=16, log=None):
+    positions = book_positions(plies)
+    tasks = [(p, depth, time_limit, table_mb) for p in positions]
+    start = time.perf_counter()
+    entries = []
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = executor.map(_analyse, tasks, chunksize=4)
+            for i, entry in enumerate(results, 1):
+                entries.append(entry)
+                if log and i % 100 == 0:
+                    log(f"{i}/{len(tasks)} positions, {time.perf_counter() - start:.0f}s")
+    else:
+        for i, task in enumerate(tasks, 1):
+            entries.append(_analyse(task))
+            if log and i % 100 == 0:
+                log(f"{i}/{len(tasks)} positions, {time.perf_counter() - start:.0f}s")
+    write_book(path, [e for e in entries if e[1] is not None])
+    return len(entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect a checkers opening book.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="search every position near the start and write a book")
+    build.add_argument('-o', '--output', default='opening.book')
+    build.add_argument('--plies', type=int, default=4, help="book covers positions up to this many plies in")
+    build.add_argument('--depth', type=int, default=10, help="search depth per position")
+    build.add_argument('--time', type=float, help="search each position for this many seconds instead")
+    build.add_argument('--jobs', type=int, default=1)
+    info = commands.add_parser('info', help="summarize a book file")
+    info.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        count = build_book(args.output, args.plies, args.depth, args.time, args.jobs,
+                           log=lambda message: print(message, file=sys.stderr))
+        print(f"Wrote {count} positions to {args.output}")
+    else:
+        book = OpeningBook(args.path)
+        print(f"{args.path}: {len(book)} positions, {RECORD.size} bytes per record")
+        position = Position()
+        entry = book.probe(position)
+        if entry is not None:
+            move, score, depth = entry
+            print(f"Start position: {pdn_notation(move)} (score {score:+.2f}, depth {depth})")
+        book.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,10 @@
-import pygame
-import math
-import copy
-from collections import defaultdict
+import os
+# pygame prints a banner on import; the headless tools write data to stdout
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+try:
+    import pygame
+except ImportError:  # Headless use (engine, tools) needs no display
+    pygame = None
 
 class Constants:
     ROWS = 8
@@ -14,7 +17,90 @@ class Constants:
     BLUE = (100, 100, 255)    # Move indicators
     GREEN = (100, 255, 100)   # Selection highlight
 
-CROWN = pygame.transform.scale(pygame.image.load('crown.png'), (44, 25))
+CROWN = None  # Loaded on first draw so importing this module needs no pygame
+
+def load_crown():
+    global CROWN
+    if CROWN is None:
+        CROWN = pygame.transform.scale(pygame.image.load('crown.png'), (44, 25))
+    return CROWN
+
+_squares_cache = {}
+
+def squares_surface(size):
+    # The empty checkerboard for a surface of the given size, drawn once and
+    # reused by every redraw after that.
+    key = (size, Constants.SQUARE_SIZE)
+    if key not in _squares_cache:
+        surface = pygame.Surface(size)
+        surface.fill(Constants.GREY)
+        for row in range(Constants.ROWS):
+            for col in range(row % 2, Constants.COLS, 2):
+                pygame.draw.rect(surface, Constants.BLACK,
+                               (row * Constants.SQUARE_SIZE,
+                                col * Constants.SQUARE_SIZE,
+                                Constants.SQUARE_SIZE,
+                                Constants.SQUARE_SIZE))
+        _squares_cache[key] = surface
+    return _squares_cache[key]
+
+# Precomputed diagonal tables for move generation. For the square at
+# (row, col), STEPS[row][col][d] is its neighbor in direction d and
+# JUMPS[row][col][d] the landing square of a jump in that direction (None
+# when off the board). Directions come in vertical pairs, left then right.
+DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+UP = (0, 1)
+DOWN = (2, 3)
+
+def _diagonal_table(distance):
+    table = []
+    for row in range(Constants.ROWS):
+        table.append([])
+        for col in range(Constants.COLS):
+            squares = []
+            for dr, dc in DIRECTIONS:
+                r, c = row + dr * distance, col + dc * distance
+                squares.append((r, c) if 0 <= r < Constants.ROWS and 0 <= c < Constants.COLS else None)
+            table[row].append(tuple(squares))
+    return table
+
+STEPS = _diagonal_table(1)
+JUMPS = _diagonal_table(2)
+
+# Piece-square tables for the evaluation, in hundredths of a man and from
+# WHITE's point of view: PIECE_SQUARE[color, king][row][col] is what that
+# piece is worth on that square. Material, plus a guard bonus for men still
+# on their own back row, a bonus per row a man has advanced and one for the
+# four centre squares. A Board keeps the sum over its pieces (Board.score)
+# up to date as pieces move, are captured and are crowned, so evaluate()
+# never has to look at the squares.
+MAN = 100
+KING = 150
+BACK_RANK = 10
+CENTER = 5
+ADVANCE = 2
+
+def _piece_square_table(color, king):
+    table = []
+    for row in range(Constants.ROWS):
+        # Rows advanced from the color's own back row
+        rank = row if color == Constants.WHITE else Constants.ROWS - 1 - row
+        table.append([])
+        for col in range(Constants.COLS):
+            if king:
+                value = KING
+            else:
+                value = MAN + ADVANCE * rank + (BACK_RANK if rank == 0 else 0)
+            if 3 <= row <= 4 and 2 <= col <= 5:
+                value += CENTER
+            table[row].append(value if color == Constants.WHITE else -value)
+    return table
+
+PIECE_SQUARE = {(color, king): _piece_square_table(color, king)
+                for color in (Constants.WHITE, Constants.RED) for king in (False, True)}
+
+def piece_value(piece):
+    return PIECE_SQUARE[piece.color, piece.king][piece.row][piece.col]
 
 class Piece:
     PADDING = 20
@@ -25,28 +111,36 @@ class Piece:
         self.col = col
         self.color = color
         self.king = False
-        self.x = 0
-        self.y = 0
-        self.calc_pos()
 
-    def calc_pos(self):
-        self.x = Constants.SQUARE_SIZE * self.col + Constants.SQUARE_SIZE // 2
-        self.y = Constants.SQUARE_SIZE * self.row + Constants.SQUARE_SIZE // 2
+    # Pixel position, computed on demand so pieces can exist (and move
+    # during search) before the GUI has set Constants.SQUARE_SIZE.
+    @property
+    def x(self):
+        return Constants.SQUARE_SIZE * self.col + Constants.SQUARE_SIZE // 2
+
+    @property
+    def y(self):
+        return Constants.SQUARE_SIZE * self.row + Constants.SQUARE_SIZE // 2
 
     def make_king(self):
         self.king = True
 
+    def copy(self):
+        piece = Piece(self.row, self.col, self.color)
+        piece.king = self.king
+        return piece
+
     def draw(self, win):
         radius = Constants.SQUARE_SIZE // 2 - self.PADDING
         pygame.draw.circle(win, Constants.GREY, (self.x, self.y), radius + self.OUTLINE)
         pygame.draw.circle(win, self.color, (self.x, self.y), radius)
         if self.king:
-            win.blit(CROWN, (self.x - CROWN.get_width()//2, self.y - CROWN.get_height()//2))
+            crown = load_crown()
+            win.blit(crown, (self.x - crown.get_width()//2, self.y - crown.get_height()//2))
 
     def move(self, row, col):
         self.row = row
         self.col = col
-        self.calc_pos()
 
 class Board:
     
@@ -55,28 +149,23 @@ class Board:
         self.red_left = self.white_left = 12
         self.red_kings = self.white_kings = 0
         self.create_board()
+        self.score = self.count_score()
 
 
     def copy(self):
-        # Create a deep copy of the board
-        new_board = Board()
-        new_board.board = [row[:] for row in self.board]
+        # Create a deep copy of the board, with its own Piece objects
+        new_board = Board.__new__(Board)
+        new_board.board = [[piece and piece.copy() for piece in row] for row in self.board]
         new_board.red_left = self.red_left
         new_board.white_left = self.white_left
         new_board.red_kings = self.red_kings
         new_board.white_kings = self.white_kings
+        new_board.score = self.score
         return new_board
 
 
     def draw_squares(self, win):
-        win.fill(Constants.GREY)
-        for row in range(Constants.ROWS):
-            for col in range(row % 2, Constants.COLS, 2):
-                pygame.draw.rect(win, Constants.BLACK, 
-                               (row * Constants.SQUARE_SIZE, 
-                                col * Constants.SQUARE_SIZE, 
-                                Constants.SQUARE_SIZE, 
-                                Constants.SQUARE_SIZE))
+        win.blit(squares_surface(win.get_size()), (0, 0))
 
     def draw(self, win):
         self.draw_squares(win)
@@ -87,14 +176,16 @@ class Board:
                     piece.draw(win)
 
     def move(self, piece, row, col):
+        self.score -= piece_value(piece)
         self.board[piece.row][piece.col], self.board[row][col] = self.board[row][col], self.board[piece.row][piece.col]
         piece.move(row, col)
-        if row == Constants.ROWS - 1 or row == 0:
+        if (row == Constants.ROWS - 1 or row == 0) and not piece.king:
             piece.make_king()
             if piece.color == Constants.WHITE:
                 self.white_kings += 1
             else:
                 self.red_kings += 1
+        self.score += piece_value(piece)
 
     def get_piece(self, row, col):
         return self.board[row][col]
@@ -115,82 +206,58 @@ class Board:
 
     def get_valid_moves(self, piece):
         moves = {}
-        left = piece.col - 1
-        right = piece.col + 1
-        row = piece.row
-
-        if piece.color == Constants.RED or piece.king:
-            moves.update(self._traverse_left(row - 1, max(row - 3, -1), -1, piece.color, left))
-            moves.update(self._traverse_right(row - 1, max(row - 3, -1), -1, piece.color, right))
-
-        if piece.color == Constants.WHITE or piece.king:
-            moves.update(self._traverse_left(row + 1, min(row + 3, Constants.ROWS), 1, piece.color, left))
-            moves.update(self._traverse_right(row + 1, min(row + 3, Constants.ROWS), 1, piece.color, right))
-
-        return moves
-
-    def _traverse_left(self, start, stop, step, color, left, skipped=[]):
-        moves = {}
-        last = []
-        for r in range(start, stop, step):
-            if left < 0:
-                break
-            current = self.board[r][left]
-            if current is None:
-                if skipped and not last:
-                    break
-                elif skipped:
-                    moves[(r, left)] = last + skipped
-                else:
-                    moves[(r, left)] = last
-                if last:
-                    if step == -1:
-                        row = max(r - 3, 0)
-                    else:
-                        row = min(r + 3, Constants.ROWS)
-                    moves.update(self._traverse_left(r + step, row, step, color, left - 1, skipped=last))
-                    moves.update(self._traverse_right(r + step, row, step, color, left + 1, skipped=last))
-                break
-            elif current.color == color:
-                break
-            else:
-                last = [current]
-            left -= 1
+        for row, col, skipped in self.iter_moves(piece):
+            moves[(row, col)] = skipped
         return moves
 
-    def _traverse_right(self, start, stop, step, color, right, skipped=[]):
-        moves = {}
-        last = []
-        for r in range(start, stop, step):
-            if right >= Constants.COLS:
-                break
-            current = self.board[r][right]
-            if current is None:
-                if skipped and not last:
-                    break
-                elif skipped:
-                    moves[(r, right)] = last + skipped
-                else:
-                    moves[(r, right)] = last
-                if last:
-                    if step == -1:
-                        row = max(r - 3, 0)
-                    else:
-                        row = min(r + 3, Constants.ROWS)
-                    moves.update(self._traverse_left(r + step, row, step, color, right - 1, skipped=last))
-                    moves.update(self._traverse_right(r + step, row, step, color, right + 1, skipped=last))
-                break
-            elif current.color == color:
-                break
-            else:
-                last = [current]
-            right += 1
-        return moves
+    def _directions(self, piece):
+        # Vertical direction groups a piece may move in: men forward only
+        # (RED up, WHITE down), kings both, up first.
+        if piece.king:
+            return (UP, DOWN)
+        return (UP,) if piece.color == Constants.RED else (DOWN,)
+
+    def iter_moves(self, piece):
+        # Yields (row, col, skipped) move records for piece, skipped listing
+        # the captured pieces, most recent first. Every landing square of a
+        # jump chain is a legal stopping point and a chain keeps the vertical
+        # direction of its first jump. Chains are walked depth-first with an
+        # explicit stack in the order the old recursive traversal used, so
+        # get_valid_moves keeps the same move for each destination.
+        board = self.board
+        color = piece.color
+        steps = STEPS[piece.row][piece.col]
+        jumps = JUMPS[piece.row][piece.col]
+        for group in self._directions(piece):
+            for d in group:
+                step = steps[d]
+                if step is None:
+                    continue
+                target = board[step[0]][step[1]]
+                if target is None:
+                    yield step[0], step[1], []
+                    continue
+                land = jumps[d]
+                if target.color == color or land is None or board[land[0]][land[1]] is not None:
+                    continue
+                stack = [(land, [target])]
+                while stack:
+                    (row, col), skipped = stack.pop()
+                    yield row, col, skipped
+                    for d2 in reversed(group):
+                        land = JUMPS[row][col][d2]
+                        if land is None or board[land[0]][land[1]] is not None:
+                            continue
+                        over = STEPS[row][col][d2]
+                        captured = board[over[0]][over[1]]
+                        if captured is not None and captured.color != color:
+                            stack.append((land, [captured] + skipped))
 
     def remove(self, pieces):
         for piece in pieces:
             self.board[piece.row][piece.col] = None
             if piece is not None:
+                self.score -= piece_value(piece)
                 if piece.color == Constants.RED:
                     self.red_left -= 1
                 else:
@@ -202,16 +269,34 @@ class Board:
         elif self.white_left <= 0:
             return Constants.RED
         
-        red_moves = self.get_all_valid_moves(Constants.RED)
-        white_moves = self.get_all_valid_moves(Constants.WHITE)
-
-        if not red_moves:
+        if not self.has_moves(Constants.RED):
             return Constants.WHITE
-        elif not white_moves:
+        elif not self.has_moves(Constants.WHITE):
             return Constants.RED
 
         return None
 
+    def has_moves(self, color):
+        # Stops at the first piece with a step or a jump available, without
+        # building any move lists.
+        board = self.board
+        for piece in self.get_all_pieces(color):
+            steps = STEPS[piece.row][piece.col]
+            jumps = JUMPS[piece.row][piece.col]
+            for group in self._directions(piece):
+                for d in group:
+                    step = steps[d]
+                    if step is None:
+                        continue
+                    target = board[step[0]][step[1]]
+                    if target is None:
+                        return True
+                    land = jumps[d]
+                    if (target.color != color and land is not None and
+                            board[land[0]][land[1]] is None):
+                        return True
+        return False
+
     def get_all_valid_moves(self, color):
         moves = []
         for piece in self.get_all_pieces(color):
@@ -227,95 +312,9 @@ class Board:
                     pieces.append(piece)
         return pieces
 
-    def evaluate(self):
-        return (self.white_left - self.red_left + 
-                (self.white_kings * 0.5 - self.red_kings * 0.5))
-
-def minimax(position, depth, maximizing_player):
-    if depth == 0 or position.winner() is not None:
-        return position.evaluate(), position
-
-    if maximizing_player:
-        return max_value(position, depth)
-    else:
-        return min_value(position, depth)
+    def count_score(self):
+        # The piece-square sum from scratch, for a board set up directly
+        return sum(piece_value(piece) for row in self.board for piece in row if piece)
 
-def max_value(position, depth):
-    max_eval = -math.inf
-    best_move = None
-    
-    for move in get_all_moves(position, Constants.WHITE):
-        evaluation, _ = minimax(move, depth - 1, False)
-        if evaluation > max_eval:
-            max_eval = evaluation
-            best_move = move
-            
-    return max_eval, best_move
-
-def min_value(position, depth):
-    min_eval = math.inf
-    best_move = None
-    
-    for move in get_all_moves(position, Constants.RED):
-        evaluation, _ = minimax(move, depth - 1, True)
-        if evaluation < min_eval:
-            min_eval = evaluation
-            best_move = move
-            
-    return min_eval, best_move
-
-def alphabeta(position, depth, alpha, beta, maximizing_player):
-    if depth == 0 or position.winner() is not None:
-        return position.evaluate(), position
-
-    if maximizing_player:
-        return max_value_ab(position, depth, alpha, beta)
-    else:
-        return min_value_ab(position, depth, alpha, beta)
-
-def max_value_ab(position, depth, alpha, beta):
-    max_eval = -math.inf
-    best_move = None
-    
-    for move in get_all_moves(position, Constants.WHITE):
-        evaluation, _ = (alphabeta(move, depth - 1, alpha, beta, False))
-        if evaluation > max_eval:
-            max_eval = evaluation
-            best_move = move
-        alpha = max(alpha, evaluation)
-        if beta <= alpha:
-            break
-            
-    return max_eval, best_move
-
-def min_value_ab(position, depth, alpha, beta):
-    min_eval = math.inf
-    best_move = None
-    
-    for move in get_all_moves(position, Constants.RED):
-        evaluation, _ = (alphabeta(move, depth - 1, alpha, beta, True))
-        if evaluation < min_eval:
-            min_eval = evaluation
-            best_move = move
-        beta = min(beta, evaluation)
-        if beta <= alpha:
-            break
-            
-    return min_eval, best_move
-
-def get_all_moves(board, color):
-    moves = []
-    for piece in board.get_all_pieces(color):
-        valid_moves = board.get_valid_moves(piece)
-        for move, skip in valid_moves.items():
-            temp_board = copy.deepcopy(board)
-            temp_piece = temp_board.get_piece(piece.row, piece.col)
-            new_board = simulate_move(temp_piece, move, temp_board, skip)
-            moves.append(new_board)
-    return moves
-
-def simulate_move(piece, move, board, skip):
-    board.move(piece, move[0], move[1])
-    if skip:
-        board.remove(skip)
-    return board
\ No newline at end of file
+    def evaluate(self):
+        return self.score / 100
\ No newline at end of file
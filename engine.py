@@ -0,0 +1,700 @@
+import math
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from bitboard import Position, WHITE, RED, pdn_notation
+from evaluation import evaluate_position, evaluate_positions
+from stats import SearchStats
+from tablebase import open_tablebase
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+# Search over bitboard Positions. WHITE (the AI) is the maximizing player.
+# Every function returns (score, move) where move is a Position.get_moves()
+# tuple, or None at terminal/leaf nodes.
+
+MAX_DEPTH = 64
+MAX_PLY = 128
+QUIESCENCE_NODES = 1000  # Capture-search nodes allowed below each horizon node
+NULL_WINDOW = 1e-6  # Width of the windows PVS uses to test moves after the first
+ASPIRATION_WINDOW = 0.5  # Half-width of the first aspiration window around the last score
+ASPIRATION_TRIES = 3  # Windows tried (each 4 times wider) before a full-width search
+BATCH_MIN = 4  # Fewer positions than this are evaluated one at a time, not in a batch
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchContext:
+    # State shared by every node of one search: the transposition table, the
+    # wall-clock deadline and stop event after which the search unwinds with
+    # SearchTimeout, the endgame tablebase, the batch leaf evaluator (see
+    # batched_alphabeta), the quiescence node budget (0 turns quiescence
+    # off), the last aspiration search's score (see aspiration), the
+    # killer-move and history tables used for move ordering, and the
+    # SearchStats counters.
+
+    def __init__(self, table=None, deadline=None, stop=None, tablebase=None, evaluator=None,
+                 quiescence_nodes=QUIESCENCE_NODES):
+        self.table = table
+        self.deadline = deadline
+        self.stop = stop
+        self.tablebase = tablebase
+        self.evaluator = evaluator
+        self.quiescence_nodes = quiescence_nodes
+        self.quiescence_left = 0
+        self.root_score = None
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = {}
+        self.stats = SearchStats()
+
+    def check_time(self):
+        # Called once per node, so it also keeps the node count.
+        self.stats.nodes += 1
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+        if self.stop is not None and self.stop.is_set():
+            raise SearchTimeout()
+
+    def evaluate(self, position):
+        # The batch evaluator's score for a single position, without paying
+        # for a batch call
+        if self.evaluator is not None:
+            return evaluate_position(position)
+        return position.evaluate()
+
+    def record_cutoff(self, move, depth, ply):
+        # Quiet moves that cause a beta cutoff become killers for this ply and
+        # gain history weight; captures are already ordered first.
+        if move[2]:
+            return
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        key = (move[0], move[1])
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+    def order_moves(self, moves, ply, tt_move=None):
+        # Best move from the transposition table (the previous iteration's
+        # choice at the root) first, then captures by number of pieces taken,
+        # then this ply's killers, then quiet moves by history score.
+        killers = self.killers[ply]
+        history = self.history
+
+        def priority(move):
+            if move == tt_move:
+                return (3, 0)
+            if move[2]:
+                return (2, move[2].bit_count())
+            if move == killers[0]:
+                return (1, 1)
+            if move == killers[1]:
+                return (1, 0)
+            return (0, history.get((move[0], move[1]), 0))
+
+        moves.sort(key=priority, reverse=True)
+        return moves
+
+    def staged_moves(self, position, ply, tt_move=None):
+        # The moves of a node in the order order_moves would give them, but
+        # generated in stages so a cutoff skips the later ones: the
+        # transposition-table move, captures by number of pieces taken,
+        # this ply's killers, then the remaining quiet moves by history
+        # score. Quiet moves are only generated once every capture has been
+        # searched.
+        stats = self.stats
+        if tt_move is not None and not tt_move[2]:
+            if position.is_step(tt_move):
+                yield tt_move
+            else:
+                tt_move = None
+        captures = position.get_moves(captures_only=True)
+        stats.generated += len(captures)
+        if tt_move is not None and tt_move[2]:
+            if tt_move in captures:
+                yield tt_move
+            else:
+                tt_move = None
+        captures.sort(key=lambda move: move[2].bit_count(), reverse=True)
+        for move in captures:
+            if move != tt_move:
+                yield move
+
+        killers = tuple(self.killers[ply])
+        for killer in killers:
+            if killer is not None and killer != tt_move and position.is_step(killer):
+                yield killer
+        history = self.history
+        quiet = position.get_quiet_moves()
+        stats.generated += len(quiet)
+        quiet.sort(key=lambda move: history.get((move[0], move[1]), 0), reverse=True)
+        for move in quiet:
+            if move != tt_move and move not in killers:
+                yield move
+
+
+def children(position):
+    # Legal moves for the side to move, or None if the position is terminal:
+    # the side to move is out of pieces or moves, or (as in Board.winner)
+    # the other side is blocked. Searches reuse this list for the node's
+    # children instead of generating moves once more in winner().
+    moves = position.get_moves()
+    if not moves or not position.has_moves(RED if position.turn == WHITE else WHITE):
+        return None
+    return moves
+
+def is_terminal(position):
+    # children(position) is None, without generating the moves: for nodes
+    # that generate them in stages (SearchContext.staged_moves).
+    return not position.has_moves(position.turn) or not position.has_moves(
+        RED if position.turn == WHITE else WHITE)
+
+def minimax(position, depth, context=None):
+    if context is None:
+        context = SearchContext()
+    context.check_time()
+    stats = context.stats
+    if depth == 0:
+        stats.leaves += 1
+        return position.evaluate(), None
+    moves = children(position)
+    if moves is None:
+        stats.leaves += 1
+        return position.evaluate(), None
+    stats.expanded += 1
+    stats.generated += len(moves)
+
+    if position.turn == WHITE:
+        return max_value(position, depth, context, moves)
+    else:
+        return min_value(position, depth, context, moves)
+
+def max_value(position, depth, context=None, moves=None):
+    max_eval = -math.inf
+    best_move = None
+
+    for move in moves if moves is not None else position.get_moves():
+        evaluation, _ = minimax(position.play(move), depth - 1, context)
+        if evaluation > max_eval:
+            max_eval = evaluation
+            best_move = move
+
+    return max_eval, best_move
+
+def min_value(position, depth, context=None, moves=None):
+    min_eval = math.inf
+    best_move = None
+
+    for move in moves if moves is not None else position.get_moves():
+        evaluation, _ = minimax(position.play(move), depth - 1, context)
+        if evaluation < min_eval:
+            min_eval = evaluation
+            best_move = move
+
+    return min_eval, best_move
+
+def alphabeta(position, depth, alpha=-math.inf, beta=math.inf, context=None, ply=0):
+    # negamax without the null-window searches: every move gets the full window
+    return _white_search(position, depth, alpha, beta, context, ply, scout=False)
+
+def quiescence(position, alpha, beta, context, ply=0, score=None):
+    # Below the horizon, keep searching captures only until the side to move
+    # has none, so a leaf is never scored in the middle of an exchange.
+    # Captures are optional, so the side to move may always stand pat on the
+    # static evaluation instead (score, if the caller already has it). Each
+    # call gets context.quiescence_nodes nodes; past that, positions are
+    # scored as they stand.
+    context.quiescence_left = context.quiescence_nodes
+    return _quiesce(position, alpha, beta, context, ply, score)
+
+def _quiesce(position, alpha, beta, context, ply, score=None):
+    context.check_time()
+    stats = context.stats
+    stats.q_nodes += 1
+    if ply and context.tablebase is not None:
+        exact = context.tablebase.score(position)
+        if exact is not None:
+            stats.tb_hits += 1
+            stats.leaves += 1
+            return exact
+    context.quiescence_left -= 1
+    if score is None:
+        score = context.evaluate(position)
+    if context.quiescence_left <= 0 or ply >= MAX_PLY - 1:
+        stats.q_exhausted += 1
+        stats.leaves += 1
+        return score
+    captures = position.get_moves(captures_only=True)
+    if not captures:
+        stats.leaves += 1
+        return score
+    captures.sort(key=lambda move: move[2].bit_count(), reverse=True)
+
+    if position.turn == WHITE:
+        if score >= beta:
+            return score
+        alpha = max(alpha, score)
+    else:
+        if score <= alpha:
+            return score
+        beta = min(beta, score)
+    children = [position.play(move) for move in captures]
+    # A batch evaluator scores several children in the time of one
+    if context.evaluator is not None and len(children) >= BATCH_MIN:
+        scores = context.evaluator(children)
+    else:
+        scores = [None] * len(children)
+    for child, child_score in zip(children, scores):
+        if position.turn == WHITE:
+            score = max(score, _quiesce(child, alpha, beta, context, ply + 1, child_score))
+            alpha = max(alpha, score)
+        else:
+            score = min(score, _quiesce(child, alpha, beta, context, ply + 1, child_score))
+            beta = min(beta, score)
+        if beta <= alpha:
+            break
+    return score
+
+def frontier_value(position, moves, alpha, beta, context, ply=0):
+    # A node one ply above the leaves: score all children with a single
+    # context.evaluator call instead of one evaluation per child. Children
+    # with a capture pending are searched by quiescence instead.
+    stats = context.stats
+    positions = [position.play(move) for move in moves]
+    scores = context.evaluator(positions)
+    maximizing = position.turn == WHITE
+    best = None
+    for i, child in enumerate(positions):
+        score = None
+        if context.tablebase is not None:
+            score = context.tablebase.score(child)
+            if score is not None:
+                stats.tb_hits += 1
+        if score is None and context.quiescence_nodes and child.has_captures():
+            scores[i] = quiescence(child, alpha, beta, context, ply + 1, scores[i])
+        else:
+            if score is not None:
+                scores[i] = score
+            stats.nodes += 1
+            stats.leaves += 1
+        if best is None or (scores[i] > scores[best] if maximizing else scores[i] < scores[best]):
+            best = i
+        if maximizing:
+            alpha = max(alpha, scores[i])
+        else:
+            beta = min(beta, scores[i])
+        if beta <= alpha:
+            break
+    return scores[best], moves[best]
+
+def batched_alphabeta(position, depth, alpha=-math.inf, beta=math.inf, context=None, ply=0):
+    # alphabeta with evaluation.evaluate_positions (needs NumPy) scoring the
+    # leaves, siblings in one batch.
+    if context is None:
+        context = SearchContext()
+    context.evaluator = evaluate_positions
+    return alphabeta(position, depth, alpha, beta, context, ply)
+
+# Negamax, with principal variation search unless scout is off. Inside
+# negamax scores are from the side to move's point of view; alphabeta and pvs
+# convert to and from WHITE's point of view (same arguments and results, same
+# transposition table entries).
+
+def _flip(alpha, beta, sign):
+    # A window from WHITE's point of view to the side to move's, or back.
+    return (alpha, beta) if sign > 0 else (-beta, -alpha)
+
+def negamax(position, depth, alpha, beta, context, ply=0, scout=True):
+    sign = 1 if position.turn == WHITE else -1
+    if depth == 0 and context.quiescence_nodes:
+        return sign * quiescence(position, *_flip(alpha, beta, sign), context, ply), None
+    context.check_time()
+    stats = context.stats
+    if ply and context.tablebase is not None:
+        score = context.tablebase.score(position)
+        if score is not None:
+            stats.tb_hits += 1
+            stats.leaves += 1
+            return sign * score, None
+    if depth == 0:
+        stats.leaves += 1
+        return sign * context.evaluate(position), None
+
+    table = context.table
+    tt_move = None
+    if table is not None:
+        stats.tt_probes += 1
+        entry = table.probe(position.key)
+        if entry is not None:
+            stats.tt_hits += 1
+            tt_move = entry[4]
+            if entry[1] >= depth and tt_move is not None:
+                _, _, flag, score, move, _ = entry
+                score *= sign
+                if sign < 0 and flag != EXACT:
+                    flag = LOWER if flag == UPPER else UPPER
+                if flag == EXACT:
+                    stats.tt_cutoffs += 1
+                    return score, move
+                elif flag == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    stats.tt_cutoffs += 1
+                    return score, move
+    if is_terminal(position):
+        stats.leaves += 1
+        return sign * context.evaluate(position), None
+    stats.expanded += 1
+    alpha_orig, beta_orig = alpha, beta
+
+    if depth == 1 and context.evaluator is not None:
+        moves = position.get_moves()
+        stats.generated += len(moves)
+        score, best_move = frontier_value(position, moves, *_flip(alpha, beta, sign), context, ply)
+        best_score = sign * score
+    else:
+        best_score = -math.inf
+        best_move = None
+        for index, move in enumerate(context.staged_moves(position, ply, tt_move)):
+            child = position.play(move)
+            if index == 0 or not scout:
+                score = -negamax(child, depth - 1, -beta, -alpha, context, ply + 1, scout)[0]
+            else:
+                # Later moves only have to be shown no better than alpha; a
+                # move that is better after all is searched again in full.
+                score = -negamax(child, depth - 1, -alpha - NULL_WINDOW, -alpha, context, ply + 1, scout)[0]
+                if alpha < score < beta:
+                    stats.pvs_researches += 1
+                    score = -negamax(child, depth - 1, -beta, -alpha, context, ply + 1, scout)[0]
+            if score > best_score:
+                best_score = score
+                best_move = move
+            alpha = max(alpha, score)
+            if beta <= alpha:
+                context.record_cutoff(move, depth, ply)
+                stats.count_cutoff(index)
+                break
+
+    if table is not None:
+        if best_score <= alpha_orig:
+            flag = UPPER
+        elif best_score >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        if sign < 0 and flag != EXACT:
+            flag = LOWER if flag == UPPER else UPPER
+        table.store(position.key, depth, flag, sign * best_score, best_move)
+    return best_score, best_move
+
+def _white_search(position, depth, alpha, beta, context, ply, scout):
+    if context is None:
+        context = SearchContext()
+    sign = 1 if position.turn == WHITE else -1
+    score, move = negamax(position, depth, *_flip(alpha, beta, sign), context, ply, scout)
+    return sign * score, move
+
+def pvs(position, depth, alpha=-math.inf, beta=math.inf, context=None, ply=0):
+    return _white_search(position, depth, alpha, beta, context, ply, scout=True)
+
+def batched_pvs(position, depth, alpha=-math.inf, beta=math.inf, context=None, ply=0):
+    if context is None:
+        context = SearchContext()
+    context.evaluator = evaluate_positions
+    return pvs(position, depth, alpha, beta, context, ply)
+
+def aspiration(position, depth, context=None, search=pvs):
+    # Root search in a narrow window around the previous iteration's score
+    # (context.root_score). A score on or outside the window is only a
+    # bound, so that side of the window is widened and the depth searched
+    # again, ending with a full-width window.
+    if context is None:
+        context = SearchContext()
+    guess = context.root_score
+    alpha, beta = -math.inf, math.inf
+    if guess is not None:
+        alpha, beta = guess - ASPIRATION_WINDOW, guess + ASPIRATION_WINDOW
+    width = ASPIRATION_WINDOW
+    tries = 1
+    while True:
+        score, move = search(position, depth, alpha, beta, context)
+        if alpha < score < beta:
+            break
+        context.stats.aspiration_researches += 1
+        width *= 4
+        tries += 1
+        if score <= alpha:
+            alpha = score - width if tries < ASPIRATION_TRIES else -math.inf
+        else:
+            beta = score + width if tries < ASPIRATION_TRIES else math.inf
+    context.root_score = score
+    return score, move
+
+def principal_variation(position, move, table=None, depth=MAX_DEPTH):
+    # The root move followed by the transposition table's best moves, in
+    # PDN notation.
+    pv = []
+    seen = set()
+    while move is not None and len(pv) < depth and position.key not in seen:
+        seen.add(position.key)
+        pv.append(pdn_notation(move))
+        position = position.play(move)
+        move = table.best_move(position.key) if table is not None else None
+        if move is not None and move not in position.get_moves():
+            break
+    return pv
+
+def iterative_deepening(position, time_limit, search=alphabeta, table=None, max_depth=MAX_DEPTH,
+                        context=None):
+    # Search depth 1, 2, 3, ... until time_limit seconds have passed and
+    # return (score, move, depth) from the last depth that finished. An
+    # iteration still running at the deadline (or when context.stop is set)
+    # is abandoned. A time_limit of None searches until stopped.
+    start = time.perf_counter()
+    if context is None:
+        context = SearchContext(table)
+    if time_limit is not None:
+        context.deadline = start + time_limit
+    context.stats.start = start
+    moves = position.get_moves()
+    if not moves:
+        return position.evaluate(), None, 0
+    result = (None, moves[0], 0)
+    for depth in range(1, max_depth + 1):
+        try:
+            score, move = search(position, depth, context=context)
+        except SearchTimeout:
+            break
+        result = (score, move, depth)
+        context.stats.record_iteration(depth, time.perf_counter() - start, score,
+                                       principal_variation(position, move, context.table, depth))
+        # The next depth costs several times this one; don't start an
+        # iteration that has no chance of finishing.
+        deadline = context.deadline
+        if deadline is not None and time.perf_counter() - start > (deadline - start) / 2:
+            break
+        # Every child of a tablebase position is in the tablebase too, so
+        # deeper iterations can't change the result.
+        if context.tablebase is not None and context.tablebase.probe(position) is not None:
+            break
+    context.stats.seconds = time.perf_counter() - start
+    return result
+
+
+class SearchThread:
+    # Runs iterative_deepening on a background thread so the caller (the GUI
+    # loop) can keep handling events and poll done() every frame.
+    #
+    # A search started with time_limit=None is a ponder search: it runs until
+    # cancel() or until ponderhit() turns it into a normal timed search.
+
+    def __init__(self, position, time_limit, search=alphabeta, table=None, max_depth=MAX_DEPTH,
+                 tablebase=None):
+        self.position = position
+        self.result = None
+        self.error = None  # The exception if the search failed; result stays None
+        self.start_time = time.perf_counter()
+        self.context = SearchContext(table, stop=threading.Event(), tablebase=tablebase)
+        if time_limit is not None:
+            self.context.deadline = self.start_time + time_limit
+        self._thread = threading.Thread(
+            target=self._run, args=(search, max_depth), daemon=True)
+        self._thread.start()
+
+    def _run(self, search, max_depth):
+        try:
+            self.result = iterative_deepening(self.position, None, search,
+                                              max_depth=max_depth, context=self.context)
+        except Exception as e:
+            self.error = e
+
+    def done(self):
+        return not self._thread.is_alive()
+
+    def cancel(self):
+        self.context.stop.set()
+        self._thread.join()
+
+    def ponderhit(self, time_limit):
+        # The predicted move was played. Time already spent pondering counts
+        # towards the move, so a long think on the human side can make the
+        # reply instant.
+        self.context.deadline = max(time.perf_counter(), self.start_time + time_limit)
+
+
+# Parallel root search. The first (best-ordered) root move is searched in
+# this process to establish a bound; the remaining root moves are then
+# searched concurrently in worker processes against that bound. Each worker
+# keeps its own transposition table for the life of the pool, and maps the
+# endgame tablebase file (if any) itself.
+
+WORKER_TT_MB = 16
+
+_worker_table = None
+_worker_tablebase = None
+
+def _init_worker(table_mb, tablebase_path=None):
+    global _worker_table, _worker_tablebase
+    _worker_table = TranspositionTable(table_mb)
+    if tablebase_path is not None:
+        _worker_tablebase = open_tablebase(tablebase_path)
+
+def _search_root_move(position, depth, alpha, beta, time_limit, search=alphabeta,
+                      quiescence_nodes=QUIESCENCE_NODES, killers=None, history=None):
+    # Searches one root child with the caller's quiescence budget and move
+    # ordering tables. Returns (score, line, nodes), line being this
+    # worker's table entries along the child's best line so the caller can
+    # store them in its own table; score is None on timeout.
+    if _worker_table is not None:
+        _worker_table.new_search()
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    context = SearchContext(_worker_table, deadline, tablebase=_worker_tablebase,
+                            quiescence_nodes=quiescence_nodes)
+    if killers is not None:
+        context.killers = killers
+    if history is not None:
+        context.history = history
+    try:
+        score, _ = search(position, depth, alpha, beta, context, 1)
+    except SearchTimeout:
+        return None, [], context.stats.nodes
+    return score, _table_line(_worker_table, position, depth), context.stats.nodes
+
+def _table_line(table, position, depth):
+    # (key, depth, flag, score, move) entries from position along the
+    # table's best moves.
+    line = []
+    seen = set()
+    while table is not None and len(line) < depth and position.key not in seen:
+        seen.add(position.key)
+        entry = table.probe(position.key)
+        if entry is None:
+            break
+        line.append(entry[:5])
+        move = entry[4]
+        if move is None or move not in position.get_moves():
+            break
+        position = position.play(move)
+    return line
+
+def make_executor(workers, table_mb=WORKER_TT_MB, tablebase_path=None):
+    # Returns None for workers <= 1, which selects the serial search. The
+    # worker processes are started here rather than on the first submit,
+    # which comes from a search thread: forking while other threads run can
+    # leave the children with locks that are never released.
+    if workers is None or workers <= 1:
+        return None
+    executor = make_pool(workers, table_mb, tablebase_path)
+    executor.submit(int).result()  # With fork, the first submit starts every worker
+    return executor
+
+def make_pool(workers, table_mb=WORKER_TT_MB, tablebase_path=None):
+    # Worker processes for parallel_alphabeta or for whole searches
+    # (search_in_worker), even with a single worker.
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=(table_mb, tablebase_path))
+
+def search_in_worker(position, ai_type, time_limit, batched=False, max_depth=MAX_DEPTH):
+    # One search for the side to move, run in a make_pool worker with that
+    # worker's transposition table and tablebase: timed, or to max_depth
+    # with time_limit None. Returns (move, score, depth, nodes).
+    search, uses_table = search_function(ai_type, batched=batched)
+    table = _worker_table if uses_table else None
+    if table is not None:
+        table.new_search()
+    context = SearchContext(table, tablebase=_worker_tablebase if uses_table else None)
+    score, move, depth = iterative_deepening(position, time_limit, search, table, max_depth, context)
+    return move, score, depth, context.stats.nodes
+
+def parallel_alphabeta(position, depth, alpha=-math.inf, beta=math.inf, context=None, executor=None,
+                       search=alphabeta):
+    # search is alphabeta or batched_alphabeta, used for every subtree.
+    if context is None:
+        context = SearchContext()
+    moves = children(position)
+    if executor is None or depth < 2 or moves is None or len(moves) < 2:
+        return search(position, depth, alpha, beta, context)
+
+    tt_move = context.table.best_move(position.key) if context.table is not None else None
+    moves = context.order_moves(moves, 0, tt_move)
+    maximizing = position.turn == WHITE
+    alpha_orig, beta_orig = alpha, beta
+    best_score, _ = search(position.play(moves[0]), depth - 1, alpha, beta, context, 1)
+    best = moves[0]
+    if maximizing:
+        alpha = max(alpha, best_score)
+    else:
+        beta = min(beta, best_score)
+
+    if alpha < beta:
+        time_limit = None
+        if context.deadline is not None:
+            time_limit = context.deadline - time.perf_counter()
+            if time_limit <= 0:
+                raise SearchTimeout()
+        try:
+            futures = {executor.submit(_search_root_move, position.play(move), depth - 1,
+                                       alpha, beta, time_limit, search, context.quiescence_nodes,
+                                       context.killers, context.history): move
+                       for move in moves[1:]}
+        except (BrokenProcessPool, RuntimeError):
+            return search(position, depth, alpha_orig, beta_orig, context)
+        # Poll so a stop request is noticed while the workers run; they
+        # enforce the same deadline on their own.
+        while wait(futures, timeout=0.05).not_done:
+            context.check_time()
+        # Walk results in move order so ties resolve the same way as the
+        # serial search.
+        for future, move in futures.items():
+            if future.exception() is not None:
+                # A broken pool or a failed worker: search this depth serially
+                return search(position, depth, alpha_orig, beta_orig, context)
+            score, line, nodes = future.result()
+            context.stats.nodes += nodes
+            if score is None:
+                raise SearchTimeout()
+            if context.table is not None:
+                # The child's result and best line, for the next iteration,
+                # the principal variation and the ponder move
+                for entry in line:
+                    context.table.store(*entry)
+            if (score > best_score) if maximizing else (score < best_score):
+                best_score, best = score, move
+
+    if context.table is not None:
+        if best_score <= alpha_orig:
+            flag = UPPER
+        elif best_score >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        context.table.store(position.key, depth, flag, best_score, best)
+    return best_score, best
+
+# The GUI's AI modes by short name, for the command-line tools.
+AI_TYPES = {'minimax': "Minimax AI (Easy)", 'alphabeta': "Alpha-Beta AI (Hard)",
+            'pvs': "PVS AI (Expert)"}
+
+def search_function(ai_type, executor=None, batched=False):
+    # Returns (search, uses_table) for one of the GUI's AI modes. batched
+    # selects the batched evaluation for the Alpha-Beta and PVS AIs.
+    if ai_type == "Minimax AI (Easy)":
+        return minimax, False
+    elif ai_type == "Alpha-Beta AI (Hard)":
+        search = batched_alphabeta if batched else alphabeta
+        if executor is not None:
+            return (lambda position, depth, context: parallel_alphabeta(
+                position, depth, context=context, executor=executor, search=search)), True
+        return search, True
+    elif ai_type == "PVS AI (Expert)":
+        search = batched_pvs if batched else pvs
+        root = search
+        if executor is not None:
+            root = lambda position, depth, alpha, beta, context: parallel_alphabeta(
+                position, depth, alpha, beta, context, executor, search)
+        return (lambda position, depth, context: aspiration(position, depth, context, root)), True
+    raise ValueError(f"Unknown AI type '{ai_type}'")
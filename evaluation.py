@@ -0,0 +1,122 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from bitboard import WHITE, RED, SQUARES, FULL, SQUARE_VALUE, STEPS, UP, DOWN, bits, row_col
+
+# Vectorized evaluation of many positions at once. Boards are encoded as an
+# N x 32 int8 array, one column per dark square: 1 = white man, 2 = white
+# king, -1 = red man, -2 = red king, 0 = empty. Scores are from WHITE's
+# point of view, on the same scale as Position.evaluate (a man is worth 1):
+# its piece-square terms plus mobility and runaway men.
+#
+# NumPy is optional: without it HAVE_NUMPY is False and the searches keep
+# using Position.evaluate. evaluate_position gives the same score for a
+# single Position in plain Python, since one NumPy call costs far more
+# than scoring one board.
+
+HAVE_NUMPY = np is not None
+
+MOBILITY = 0.02     # per non-capturing move available
+RUNAWAY = 0.3       # men with no opposing piece left in front of them
+
+PIECES = (1, 2, -1, -2)  # white man, white king, red man, red king
+
+
+def _tables():
+    # Every feature is a product of the N x 128 matrix of piece planes (one
+    # 32-square plane per entry of PIECES) with one of these tables.
+    # Material and position: the piece-square tables, in men.
+    linear = np.array([[values[1 << s] / 100 for s in range(SQUARES)] for values in SQUARE_VALUE],
+                      dtype=np.float32)
+    cones = np.zeros((4, SQUARES, 2, SQUARES), dtype=np.float32)
+    for s in range(SQUARES):
+        row, col = row_col(s)
+        for t in range(SQUARES):
+            to_row, to_col = row_col(t)
+            # Red pieces on t that could stop a white man on s before it
+            # promotes (WHITE moves down the board), and the reverse.
+            if abs(to_col - col) <= to_row - row:
+                cones[2:, t, 0, s] = 1
+            if abs(to_col - col) <= row - to_row:
+                cones[:2, t, 1, s] = 1
+
+    steps = {}
+    for direction in (UP, DOWN):
+        table = np.zeros((SQUARES, SQUARES), dtype=np.float32)
+        for step in STEPS[direction]:
+            for src, dst in step.items():
+                if dst:
+                    table[src.bit_length() - 1, dst.bit_length() - 1] = 1
+        steps[direction] = table
+    # Destination squares of each side's non-capturing moves.
+    moves = np.zeros((4, SQUARES, 2, SQUARES), dtype=np.float32)
+    moves[0, :, 0] = steps[DOWN]
+    moves[1, :, 0] = steps[DOWN] + steps[UP]
+    moves[2, :, 1] = steps[UP]
+    moves[3, :, 1] = steps[UP] + steps[DOWN]
+    return (linear.reshape(4 * SQUARES), moves.reshape(4 * SQUARES, 2 * SQUARES),
+            cones.reshape(4 * SQUARES, 2 * SQUARES))
+
+if HAVE_NUMPY:
+    SHIFTS = np.arange(SQUARES, dtype=np.uint32)
+    CODES = np.array(PIECES, dtype=np.int8)[:, None]
+    LINEAR, MOVES, CONES = _tables()
+
+
+def encode(positions):
+    masks = np.array([(p.white, p.red, p.kings) for p in positions], dtype=np.uint32)
+    squares = ((masks[:, :, None] >> SHIFTS) & 1).astype(np.int8)
+    white, red, kings = squares[:, 0], squares[:, 1], squares[:, 2]
+    return (white - red) * (1 + kings)
+
+def evaluate_boards(boards):
+    # Piece-square values, mobility and runaway men for an N x 32 array of
+    # boards; returns N float32 scores.
+    planes = (boards[:, None, :] == CODES).reshape(len(boards), 4 * SQUARES).astype(np.float32)
+    empty = np.tile(boards == 0, 2)
+    men = np.concatenate((planes[:, :SQUARES], planes[:, 2 * SQUARES:3 * SQUARES]), axis=1)
+
+    score = planes @ LINEAR
+    moves = ((planes @ MOVES) * empty).reshape(-1, 2, SQUARES).sum(2)
+    score += MOBILITY * (moves[:, 0] - moves[:, 1])
+    runaway = (men * ((planes @ CONES) == 0)).reshape(-1, 2, SQUARES).sum(2)
+    score += RUNAWAY * (runaway[:, 0] - runaway[:, 1])
+    return score
+
+def evaluate_positions(positions):
+    # One call for a whole list of Positions, e.g. all children of a node.
+    if not HAVE_NUMPY:
+        raise RuntimeError("Batched evaluation needs NumPy")
+    return evaluate_boards(encode(positions)).tolist()
+
+
+def _runaway_cone(s, side):
+    # Squares from which an opposing piece could stop side's man on s
+    # before it promotes.
+    row, col = row_col(s)
+    cone = 0
+    for t in range(SQUARES):
+        to_row, to_col = row_col(t)
+        ahead = to_row - row if side == WHITE else row - to_row
+        if abs(to_col - col) <= ahead:
+            cone |= 1 << t
+    return cone
+
+RUNAWAY_CONES = tuple({1 << s: _runaway_cone(s, side) for s in range(SQUARES)}
+                      for side in (WHITE, RED))
+
+def _steps(pieces, shifts, empty):
+    return sum((shift(pieces) & empty).bit_count() for shift in shifts)
+
+def evaluate_position(position):
+    # evaluate_boards for one Position: mobility from whole-mask shifts,
+    # runaway men from the cone masks.
+    white, red, kings = position.white, position.red, position.kings
+    empty = ~(white | red) & FULL
+    mobility = (_steps(white, DOWN, empty) + _steps(white & kings, UP, empty)
+                - _steps(red, UP, empty) - _steps(red & kings, DOWN, empty))
+    runaway = (sum(1 for b in bits(white & ~kings) if not RUNAWAY_CONES[WHITE][b] & red)
+               - sum(1 for b in bits(red & ~kings) if not RUNAWAY_CONES[RED][b] & white))
+    return position.score / 100 + MOBILITY * mobility + RUNAWAY * runaway
@@ -0,0 +1,164 @@
+import re
+import time
+
+from bitboard import Position, square, row_col, bits, bit_to_square, pdn_notation
+from checkers import Constants, Piece, piece_value
+
+# Game history as a log of compact moves instead of board snapshots. Each
+# entry is (from, to, captured, captured kings, promoted): squares 0-31 as
+# in bitboard, captured squares as a bitmask. Undo and redo play an entry
+# backwards or forwards on the live Board.
+#
+# Games are saved as PDN. PDN numbers the squares 1-32 starting on the side
+# that moves first, so RED (Black in PDN) starts on 1-12: PDN square
+# 32 - s for bitboard square s.
+
+
+def make_entry(board, piece, row, col, skipped):
+    captured = captured_kings = 0
+    for p in skipped or ():
+        b = 1 << square(p.row, p.col)
+        captured |= b
+        if p.king:
+            captured_kings |= b
+    promoted = not piece.king and row in (0, Constants.ROWS - 1)
+    return square(piece.row, piece.col), square(row, col), captured, captured_kings, promoted
+
+def apply(board, entry):
+    src, dst, captured, _, _ = entry
+    board.move(board.get_piece(*row_col(src)), *row_col(dst))
+    if captured:
+        board.remove([board.get_piece(*row_col(bit_to_square(b))) for b in bits(captured)])
+
+def unapply(board, entry):
+    src, dst, captured, captured_kings, promoted = entry
+    row, col = row_col(src)
+    piece = board.get_piece(*row_col(dst))
+    board.score -= piece_value(piece)
+    board.board[piece.row][piece.col] = None
+    board.board[row][col] = piece
+    piece.move(row, col)
+    if promoted:
+        piece.king = False
+        if piece.color == Constants.WHITE:
+            board.white_kings -= 1
+        else:
+            board.red_kings -= 1
+    board.score += piece_value(piece)
+    opponent = Constants.RED if piece.color == Constants.WHITE else Constants.WHITE
+    for b in bits(captured):
+        row, col = row_col(bit_to_square(b))
+        restored = Piece(row, col, opponent)
+        if b & captured_kings:
+            restored.make_king()
+        board.board[row][col] = restored
+        board.score += piece_value(restored)
+        if opponent == Constants.RED:
+            board.red_left += 1
+        else:
+            board.white_left += 1
+
+def board_move(board, move):
+    # An engine move (from_bit, to_bit, captured_mask) as the (piece, row,
+    # col, skipped) arguments of MoveLog.play.
+    src, dst, captured = move
+    row, col = row_col(bit_to_square(dst))
+    skipped = [board.get_piece(*row_col(bit_to_square(b))) for b in bits(captured)]
+    return board.get_piece(*row_col(bit_to_square(src))), row, col, skipped
+
+def engine_move(entry):
+    src, dst, captured, _, _ = entry
+    return 1 << src, 1 << dst, captured
+
+
+class MoveLog:
+
+    def __init__(self):
+        self.moves = []
+        self.ply = 0  # moves[:ply] are on the board, the rest can be redone
+
+    def __len__(self):
+        return self.ply
+
+    def play(self, board, piece, row, col, skipped):
+        entry = make_entry(board, piece, row, col, skipped)
+        apply(board, entry)
+        if self.ply < len(self.moves) and self.moves[self.ply][:3] == entry[:3]:
+            # Same move as the next one to redo: keep the rest of the line
+            pass
+        else:
+            del self.moves[self.ply:]
+            self.moves.append(entry)
+        self.ply += 1
+        return entry
+
+    def undo(self, board):
+        if self.ply == 0:
+            return None
+        self.ply -= 1
+        entry = self.moves[self.ply]
+        unapply(board, entry)
+        return entry
+
+    def redo(self, board):
+        if self.ply == len(self.moves):
+            return None
+        entry = self.moves[self.ply]
+        apply(board, entry)
+        self.ply += 1
+        return entry
+
+    def to_pdn(self, result='*', **tags):
+        # The moves played so far (not the ones that could be redone).
+        headers = {'Event': 'AI Checkers', 'Date': time.strftime('%Y.%m.%d')}
+        headers.update(tags)
+        headers['Result'] = result
+        lines = [f'[{name} "{value}"]' for name, value in headers.items()]
+        lines.append('')
+        text = []
+        for ply, entry in enumerate(self.moves[:self.ply]):
+            if ply % 2 == 0:
+                text.append(f"{ply // 2 + 1}.")
+            text.append(pdn_notation(engine_move(entry)))
+        text.append(result)
+        # Wrap the movetext at 80 columns
+        line = ''
+        for token in text:
+            if line and len(line) + len(token) >= 80:
+                lines.append(line)
+                line = ''
+            line = f"{line} {token}" if line else token
+        lines.append(line)
+        return '\n'.join(lines) + '\n'
+
+def parse_pdn(text):
+    # Returns (tags, moves): the tag pairs and the game's moves as engine
+    # moves, checked for legality from the starting position.
+    tags = dict(re.findall(r'\[(\w+)\s+"([^"]*)"\]', text))
+    movetext = re.sub(r'\[[^\]]*\]|\{[^}]*\}|\([^)]*\)', ' ', text)
+    position = Position()
+    moves = []
+    for token in movetext.split():
+        if re.fullmatch(r'\d+\.+|\*|1-0|0-1|1/2-1/2|2-0|0-2|1-1', token):
+            continue
+        if not re.fullmatch(r'\d+([-x]\d+)+', token):
+            raise ValueError(f"Unexpected '{token}' in PDN movetext")
+        move = _find_move(position, token)
+        moves.append(move)
+        position = position.play(move)
+    return tags, moves
+
+def _find_move(position, token):
+    legal = position.get_moves()
+    for move in legal:
+        if pdn_notation(move) == token:
+            return move
+    # Captures may be written with just the first and last square
+    squares = re.split(r'[-x]', token)
+    capture = 'x' in token
+    matches = [move for move in legal
+               if pdn_notation(move).startswith(squares[0] + ('x' if capture else '-'))
+               and pdn_notation(move).endswith(('x' if capture else '-') + squares[-1])]
+    if len(matches) != 1:
+        raise ValueError(f"{'Ambiguous' if matches else 'Illegal'} move '{token}' in PDN")
+    return matches[0]
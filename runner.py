@@ -3,6 +3,10 @@ import sys
 import time
 import os
 from checkers import *
+import engine
+import book
+import tablebase
+import movelog
 
 # Initialize pygame
 pygame.init()
@@ -10,6 +14,15 @@ pygame.init()
 # Set constants - NEW DIMENSIONS 850x700
 WIDTH, HEIGHT = 748, 750
 Constants.SQUARE_SIZE = HEIGHT // Constants.ROWS  # Calculate based on rows to keep squares proper
+TT_SIZE_MB = 64  # Transposition table size for the Alpha-Beta and PVS AIs, kept for a whole game
+AI_TIME_LIMIT = 1.0  # Seconds the AI may think per move (iterative deepening)
+AI_WORKERS = os.cpu_count() or 1  # Processes for the Alpha-Beta and PVS AIs' root search (1 = serial)
+AI_PONDER = True  # Let the Alpha-Beta and PVS AIs think on the predicted reply during your turn
+AI_STATS_LOG = None  # Path to append per-move search statistics to as JSON lines
+OPENING_BOOK = 'opening.book'  # Built with book.py; the Alpha-Beta and PVS AIs play from it when present
+ENDGAME_TABLEBASE = 'endgame.tb'  # Built with tablebase.py; exact endgame results for the Alpha-Beta and PVS AIs
+AI_BATCH_EVAL = False  # Alpha-Beta and PVS AIs use the richer NumPy evaluation (needs NumPy; searches shallower)
+PDN_FILE = 'game.pdn'  # Saved with 'E', loaded with 'L'
 
 
 # Try to load crown image
@@ -50,13 +63,26 @@ class Game:
     def __init__(self, win):
         self.win = win
         self.font = pygame.font.SysFont('Arial', 24)
+        self.stats_font = pygame.font.SysFont('Arial', 16)
+        self.show_stats = False  # Search statistics overlay, toggled with 'S'
         self.title_font = pygame.font.SysFont('Arial', 50, bold=True)
         self.ai_type = None
+        self.search = None  # Background engine.SearchThread for the AI's move
+        self.ponder = None  # Background search on the predicted human reply
+        self.board_layer = pygame.Surface((HEIGHT, HEIGHT))  # Board as last drawn
+        self.drawn = None  # Square contents in board_layer; None = redraw all
+        self.ui_key = None
+        self.ui_items = []
+        self.ui_rects = []
         self._init_menu()
-        self.history = []
+        self.executor = engine.make_executor(AI_WORKERS, tablebase_path=ENDGAME_TABLEBASE)
+        self.book = book.open_book(OPENING_BOOK)
+        self.tablebase = tablebase.open_tablebase(ENDGAME_TABLEBASE)
 
     def _init_menu(self):
+        self.cancel_search()
         self.in_menu = True
+        self.menu_drawn = None
         center_x = WIDTH // 2
         button_width, button_height = 300, 60
         spacing = 20
@@ -66,6 +92,9 @@ class Game:
         self.alphabeta_btn = Button(center_x - 150, 200 + button_height + spacing, 
                                    button_width, button_height, 
                                    "Alpha-Beta AI (Fast)", Constants.GREY, Constants.WHITE)
+        self.pvs_btn = Button(center_x - 150, 200 + 2 * (button_height + spacing),
+                              button_width, button_height,
+                              "PVS AI (Fastest)", Constants.GREY, Constants.WHITE)
         
     def _init_game(self):
         self.in_menu = False
@@ -73,11 +102,22 @@ class Game:
         self.board = Board()
         self.turn = Constants.RED
         self.valid_moves = {} #set -> unique elements
+        self.log = movelog.MoveLog()  # Moves played, for undo/redo and PDN
         self.message = ""
         self.game_over = False
         self.ai_time = 0
+        self.ai_stats = None
+        self.table = engine.TranspositionTable(TT_SIZE_MB)
+        self.drawn = None
 
     def draw_menu(self):
+        mouse_pos = pygame.mouse.get_pos()
+        hovered = (self.minimax_btn.check_hover(mouse_pos), self.alphabeta_btn.check_hover(mouse_pos),
+                   self.pvs_btn.check_hover(mouse_pos))
+        # The menu only changes when a button's hover state does
+        if hovered == self.menu_drawn:
+            return
+        self.menu_drawn = hovered
         self.win.fill(Constants.BLACK)
         
         title = self.title_font.render("CHECKERS", True, Constants.WHITE)
@@ -88,54 +128,140 @@ class Game:
         subtitle_rect = subtitle.get_rect(center=(WIDTH//2, 160))
         self.win.blit(subtitle, subtitle_rect)
         
-        mouse_pos = pygame.mouse.get_pos()
-        self.minimax_btn.check_hover(mouse_pos)
-        self.alphabeta_btn.check_hover(mouse_pos)
-        
         self.minimax_btn.draw(self.win)
         self.alphabeta_btn.draw(self.win)
+        self.pvs_btn.draw(self.win)
         
         pygame.display.update()
 
+    def invalidate(self):
+        # Forget what is on screen, e.g. after the window was uncovered, so
+        # the next frame redraws everything.
+        self.menu_drawn = None
+        self.drawn = None
+
     def update(self):
-        self.win.fill(Constants.BLACK)
-        
-        # Draw board area (centered horizontally)
+        # Redraw only what changed since the last frame: squares whose piece
+        # or move marker changed, and the status bar and overlays when their
+        # text changed. The board is kept in self.board_layer, so any part of
+        # the window can be restored from it.
         board_x = (WIDTH - HEIGHT) // 2
-        board_surface = pygame.Surface((HEIGHT, HEIGHT))
-        self.board.draw(board_surface)
-        self.win.blit(board_surface, (board_x, 0))
-        
-        self.draw_valid_moves(self.valid_moves)
-        self.draw_ui()
-        pygame.display.update()
+        contents = self._square_contents()
+        if self.drawn is None:
+            self.board.draw_squares(self.board_layer)
+            for square in contents:
+                self._draw_square(square, contents[square])
+            self.drawn = contents
+            self.win.fill(Constants.BLACK)
+            self.win.blit(self.board_layer, (board_x, 0))
+            self.ui_key = None
+            self._update_ui()
+            self._draw_ui()
+            pygame.display.update()
+            return
+
+        dirty = []
+        for square in contents.keys() | self.drawn.keys():
+            if contents.get(square) != self.drawn.get(square):
+                rect = self._draw_square(square, contents.get(square))
+                dirty.append(rect.move(board_x, 0))
+        self.drawn = contents
+
+        for rect in dirty:
+            self.win.blit(self.board_layer, rect, rect.move(-board_x, 0))
+
+        old_rects = self.ui_rects
+        if self._update_ui() or any(rect.collidelist(old_rects) != -1 for rect in dirty):
+            # Uncover the old overlays, then draw the new ones on top
+            for rect in old_rects:
+                self.win.blit(self.board_layer, rect, rect.move(-board_x, 0))
+            dirty.extend(old_rects)
+            self._draw_ui()
+            dirty.extend(self.ui_rects)
+        if dirty:
+            pygame.display.update(dirty)
+
+    def _square_contents(self):
+        # {(row, col): (piece color, king, valid-move marker)} for every
+        # square that isn't empty.
+        contents = {}
+        for row, pieces in enumerate(self.board.board):
+            for col, piece in enumerate(pieces):
+                if piece is not None:
+                    contents[row, col] = (piece.color, piece.king, False)
+        for row, col in self.valid_moves:
+            contents[row, col] = (None, False, True)
+        return contents
+
+    def _draw_square(self, square, content):
+        # Redraw one square of the board layer and return its rect there
+        row, col = square
+        size = Constants.SQUARE_SIZE
+        rect = pygame.Rect(col * size, row * size, size, size)
+        self.board_layer.blit(squares_surface(self.board_layer.get_size()), rect, rect)
+        piece = self.board.get_piece(row, col)
+        if piece is not None:
+            piece.draw(self.board_layer)
+        if content is not None and content[2]:
+            pygame.draw.circle(self.board_layer, Constants.BLUE, rect.center, 15)
+        return rect
 
-    def draw_ui(self):
-        # Turn indicator
+    def _update_ui(self):
+        # Render the status bar and overlays again if their text changed;
+        # returns whether it did.
         turn_text = "Your turn (RED)" if self.turn == Constants.RED else f"{self.ai_type} thinking..."
+        time_text = f"Time: {self.ai_time:.2f}s"
+        stats = self._stats_lines() if self.show_stats else None
+        key = (turn_text, time_text, self.message, stats)
+        if key == self.ui_key:
+            return False
+        self.ui_key = key
+
+        # (surface, rect) pairs; a None surface is a black box
+        items = [(None, pygame.Rect(0, HEIGHT-50, WIDTH, 50))]
         text_surface = self.font.render(turn_text, True, Constants.WHITE)
-        pygame.draw.rect(self.win, Constants.BLACK, (0, HEIGHT-50, WIDTH, 50))
-        self.win.blit(text_surface, (20, HEIGHT-40))
+        items.append((text_surface, text_surface.get_rect(topleft=(20, HEIGHT-40))))
         
         # Time taken display
-        if hasattr(self, 'ai_time'):
-            time_text = f"Time: {self.ai_time:.2f}s"
-            time_surface = self.font.render(time_text, True, Constants.WHITE)
-            self.win.blit(time_surface, (WIDTH - 150, HEIGHT-40))
+        time_surface = self.font.render(time_text, True, Constants.WHITE)
+        items.append((time_surface, time_surface.get_rect(topleft=(WIDTH - 150, HEIGHT-40))))
+
+        if stats:
+            items.extend(self._stats_items(stats))
         
         # Game message
         if self.message:
             msg_surface = self.font.render(self.message, True, Constants.WHITE)
-            self.win.blit(msg_surface, (WIDTH//2 - msg_surface.get_width()//2, HEIGHT-80))
+            items.append((msg_surface, msg_surface.get_rect(
+                topleft=(WIDTH//2 - msg_surface.get_width()//2, HEIGHT-80))))
+        self.ui_items = items
+        return True
 
-    def draw_valid_moves(self, moves):
-        board_x = (WIDTH - HEIGHT) // 2
-        for move in moves:
-            row, col = move
-            pygame.draw.circle(self.win, Constants.BLUE, 
-                             (board_x + col * Constants.SQUARE_SIZE + Constants.SQUARE_SIZE//2, 
-                              row * Constants.SQUARE_SIZE + Constants.SQUARE_SIZE//2), 
-                             15)
+    def _draw_ui(self):
+        for surface, rect in self.ui_items:
+            if surface is None:
+                self.win.fill(Constants.BLACK, rect)
+            else:
+                self.win.blit(surface, rect)
+        self.ui_rects = [rect for _, rect in self.ui_items]
+
+    def _stats_lines(self):
+        # Live numbers while the AI thinks, else the statistics of its last
+        # move.
+        stats = self.search.context.stats if self.search is not None else self.ai_stats
+        return tuple(stats.summary()) if stats is not None else None
+
+    def _stats_items(self, lines):
+        # Overlay above the timer
+        lines = [self.stats_font.render(line, True, Constants.WHITE) for line in lines]
+        line_height = self.stats_font.get_linesize()
+        width = max(surface.get_width() for surface in lines) + 20
+        height = line_height * len(lines) + 10
+        top = HEIGHT - 50 - height
+        items = [(None, pygame.Rect(WIDTH - width, top, width, height))]
+        for i, surface in enumerate(lines):
+            items.append((surface, surface.get_rect(topleft=(WIDTH - width + 10, top + 5 + i * line_height))))
+        return items
 
     def select(self, row, col):
         if self.selected:
@@ -156,30 +282,50 @@ class Game:
     def _move(self, row, col):
         piece = self.board.get_piece(row, col)
         if self.selected and piece is None and (row, col) in self.valid_moves:
-            # Save current board state before making a move
-            self.history.append(self.board.copy())
-            self.board.move(self.selected, row, col)
-            skipped = self.valid_moves[(row, col)]
-            if skipped:
-                self.board.remove(skipped)
+            self.log.play(self.board, self.selected, row, col, self.valid_moves[(row, col)])
             self.change_turn()
         else:
             return False
         return True
     def undo_move(self):
-        if self.history:
-            self.board = self.history.pop()  # Revert to the last board state
-            self.valid_moves = {}  # Clear valid moves
-            self.selected = None  # Clear selection
-            self.message = ""  # Clear any game messages
-
-        # Adjust the turn to the correct player
-        if self.turn == Constants.WHITE and self.ai_type:  # If it's AI's turn, revert to RED
-            self.turn = Constants.RED
-        elif self.turn == Constants.RED and self.ai_type:  # If it's RED's turn, revert to AI
-            self.turn = Constants.WHITE
-        else:
+        self.cancel_search()
+        if self.log.undo(self.board) is None:
             print("No moves to undo!")  # Debug message
+            return
+        self.game_over = False
+        self.message = ""  # Clear any game messages
+        self.change_turn()  # Back to the player who made the move
+
+    def redo_move(self):
+        self.cancel_search()
+        if self.log.redo(self.board) is None:
+            print("No moves to redo!")
+            return
+        self.change_turn()
+
+    def save_game(self, path=PDN_FILE):
+        if self.game_over:
+            # PDN scores the first mover first: RED, the human, is Black
+            result = "0-1" if self.board.winner() == Constants.WHITE else "1-0"
+        else:
+            result = "*"
+        with open(path, 'w') as f:
+            f.write(self.log.to_pdn(result, Black="Human", White=self.ai_type))
+        print(f"Saved {len(self.log)} moves to {path}")
+
+    def load_game(self, path=PDN_FILE):
+        try:
+            with open(path) as f:
+                _, moves = movelog.parse_pdn(f.read())
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            return
+        self.cancel_search()
+        self._init_game()
+        for move in moves:
+            self.log.play(self.board, *movelog.board_move(self.board, move))
+            self.change_turn()
+        print(f"Loaded {len(moves)} moves from {path}")
 
     def change_turn(self):
         self.selected = None
@@ -194,29 +340,104 @@ class Game:
             self.game_over = True
             self.message = "You win!" if winner == Constants.RED else f"{self.ai_type} wins!"
 
+    def cancel_search(self):
+        for handle in (self.search, self.ponder):
+            if handle is not None:
+                handle.cancel()
+        self.search = self.ponder = None
+
     def ai_move(self):
-        # Show thinking message immediately
-        self.update()
-        pygame.display.flip()  # Force update
-        
-        # Time the AI move
-        start_time = time.time()
-        
-        if self.ai_type == "Minimax AI (Easy)":
-            _, new_board = minimax(self.board, 5, True)
-        elif self.ai_type == "Alpha-Beta AI (Hard)":
-            _, new_board = alphabeta(self.board, 5, -math.inf, math.inf, True)
-        else:
-            print(f"Error: Unknown AI type '{self.ai_type}'")
+        # Called every frame on the AI's turn. The search runs on a background
+        # thread so the window keeps handling events while the AI thinks.
+        if self.search is None:
+            if not self._play_book_move():
+                self._start_search()
             return
-        
-        end_time = time.time()
-        self.ai_time = end_time - start_time
+        if not self.search.done():
+            return
+
+        handle, self.search = self.search, None
+        self.ai_time = time.perf_counter() - self.search_start
         print(f"{self.ai_type} took {self.ai_time:.2f} seconds")
-        # Save the current board state before applying the AI's move
-        self.history.append(self.board.copy())
-        self.board = new_board
+        if handle.result is None:
+            print(f"Error: {self.ai_type} search failed: {handle.error!r}")
+            if self.executor is None:
+                self.game_over = True
+                self.message = f"{self.ai_type} failed"
+                return
+            # Drop the process pool and search again serially
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+            self._start_search()
+            return
+        _, move, _ = handle.result
+        self.ai_stats = handle.context.stats
+        if move is None:
+            return
+        if AI_STATS_LOG:
+            self.ai_stats.write_jsonl(AI_STATS_LOG, ai_type=self.ai_type,
+                                      move=engine.pdn_notation(move), seconds=self.ai_time)
+        self._apply_ai_move(handle.position, move)
+
+    def _apply_ai_move(self, position, move):
+        position = position.play(move)
+        self.log.play(self.board, *movelog.board_move(self.board, move))
         self.change_turn()
+        if not self.game_over:
+            self._start_ponder(position)
+
+    def _play_book_move(self):
+        if self.book is None or self.ai_type == "Minimax AI (Easy)":
+            return False
+        position = engine.Position.from_board(self.board, Constants.WHITE)
+        entry = self.book.probe(position)
+        if entry is None:
+            return False
+        move, score, depth = entry
+        if self.ponder is not None:
+            self.ponder.cancel()
+            self.ponder = None
+        print(f"{self.ai_type} played {engine.pdn_notation(move)} from the opening book")
+        self.ai_time = 0.0
+        self.ai_stats = None
+        self._apply_ai_move(position, move)
+        return True
+
+    def _start_search(self):
+        position = engine.Position.from_board(self.board, Constants.WHITE)
+        self.search_start = time.perf_counter()
+        if self.ponder is not None:
+            ponder, self.ponder = self.ponder, None
+            if ponder.position == position:
+                # Ponder hit: keep the search that has been running all along
+                ponder.ponderhit(AI_TIME_LIMIT)
+                self.search = ponder
+                return
+            ponder.cancel()
+
+        try:
+            search, uses_table = engine.search_function(self.ai_type, self.executor, AI_BATCH_EVAL)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+        table = self.table if uses_table else None
+        if table is not None:
+            table.new_search()
+        self.search = engine.SearchThread(position, AI_TIME_LIMIT, search, table,
+                                          tablebase=self.tablebase if uses_table else None)
+
+    def _start_ponder(self, position):
+        # Search the position after the human's most likely reply (the
+        # transposition table's best move) until the human actually moves.
+        if not AI_PONDER or self.ai_type == "Minimax AI (Easy)":
+            return
+        predicted = self.table.best_move(position.key)
+        if predicted is None or predicted not in position.get_moves():
+            return
+        self.table.new_search()
+        search, _ = engine.search_function(self.ai_type, batched=AI_BATCH_EVAL)
+        self.ponder = engine.SearchThread(position.play(predicted), None, search, self.table,
+                                          tablebase=self.tablebase)
 
 def main():
     WIN = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -231,6 +452,8 @@ def main():
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            if event.type == pygame.WINDOWEXPOSED:
+                game.invalidate()
             
             if game.in_menu:
                 mouse_pos = pygame.mouse.get_pos()
@@ -240,6 +463,9 @@ def main():
                 elif game.alphabeta_btn.is_clicked(mouse_pos, event):
                     game.ai_type = "Alpha-Beta AI (Hard)"
                     game._init_game()
+                elif game.pvs_btn.is_clicked(mouse_pos, event):
+                    game.ai_type = "PVS AI (Expert)"
+                    game._init_game()
             else:
                 if event.type == pygame.MOUSEBUTTONDOWN and not game.game_over:
                     if game.turn == Constants.RED:
@@ -256,6 +482,14 @@ def main():
                         game.undo_move()
                     if event.key == pygame.K_r:  # Restart game
                         game._init_menu()
+                    if event.key == pygame.K_y:  # Redo an undone move
+                        game.redo_move()
+                    if event.key == pygame.K_s:  # Toggle search statistics
+                        game.show_stats = not game.show_stats
+                    if event.key == pygame.K_e:  # Save the game as PDN
+                        game.save_game()
+                    if event.key == pygame.K_l:  # Load a PDN game
+                        game.load_game()
 
         if game.in_menu:
             game.draw_menu()
@@ -264,6 +498,13 @@ def main():
                 game.ai_move()
             game.update()
 
+    game.cancel_search()
+    if game.executor is not None:
+        game.executor.shutdown(cancel_futures=True)
+    if game.book is not None:
+        game.book.close()
+    if game.tablebase is not None:
+        game.tablebase.close()
     pygame.quit()
     sys.exit()
 
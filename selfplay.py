@@ -0,0 +1,165 @@
+import argparse
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import engine
+from bitboard import Position, WHITE, RED
+from checkers import Constants
+from evaluation import HAVE_NUMPY
+from transposition import TranspositionTable
+
+# Headless engine-vs-engine matches, e.g.
+#
+#   python selfplay.py --games 20 --jobs 4 alphabeta:time=0.2 minimax:depth=3
+#
+# Each game is played in its own process; players swap colors every game.
+
+SEARCHES = {'minimax': engine.minimax, 'alphabeta': engine.alphabeta, 'pvs': engine.aspiration}
+if HAVE_NUMPY:
+    SEARCHES['batched'] = engine.batched_alphabeta
+MAX_PLIES = 200     # Games still running after this many plies are drawn
+TT_SIZE_MB = 16
+
+
+class Player:
+
+    def __init__(self, algorithm, depth=None, time_limit=None):
+        if algorithm not in SEARCHES:
+            raise ValueError(f"Unknown algorithm '{algorithm}'")
+        if depth is None and time_limit is None:
+            depth = 5
+        self.algorithm = algorithm
+        self.depth = depth
+        self.time_limit = time_limit
+
+    @classmethod
+    def parse(cls, spec):
+        # "alphabeta", "alphabeta:depth=6", "minimax:time=0.5"
+        algorithm, _, options = spec.partition(':')
+        depth = time_limit = None
+        for option in filter(None, options.split(',')):
+            key, _, value = option.partition('=')
+            if key == 'depth':
+                depth = int(value)
+            elif key == 'time':
+                time_limit = float(value)
+            else:
+                raise ValueError(f"Unknown player option '{key}' in '{spec}'")
+        return cls(algorithm, depth, time_limit)
+
+    def __str__(self):
+        if self.time_limit is not None:
+            return f"{self.algorithm}:time={self.time_limit}"
+        return f"{self.algorithm}:depth={self.depth}"
+
+    def choose_move(self, position, table):
+        # Returns (move, seconds, nodes).
+        search = SEARCHES[self.algorithm]
+        if self.algorithm == 'minimax':
+            table = None
+        elif table is not None:
+            table.new_search()
+        context = engine.SearchContext(table)
+        start = time.perf_counter()
+        if self.time_limit is not None:
+            _, move, _ = engine.iterative_deepening(position, self.time_limit, search,
+                                                    max_depth=self.depth or engine.MAX_DEPTH,
+                                                    context=context)
+        else:
+            _, move = search(position, self.depth, context=context)
+        return move, time.perf_counter() - start, context.stats.nodes
+
+
+def play_game(players, random_plies=0, seed=None, max_plies=MAX_PLIES):
+    # players maps WHITE/RED to a Player. Returns the winning side (WHITE,
+    # RED or None for a draw) and per-side [moves, seconds, nodes] totals.
+    rng = random.Random(seed)
+    tables = {side: TranspositionTable(TT_SIZE_MB) for side in (WHITE, RED)}
+    totals = {WHITE: [0, 0.0, 0], RED: [0, 0.0, 0]}
+    seen = {}
+    position = Position()
+    for ply in range(max_plies):
+        winner = position.winner()
+        if winner is not None:
+            return (WHITE if winner == Constants.WHITE else RED), totals
+        seen[position] = seen.get(position, 0) + 1
+        if seen[position] >= 3:
+            return None, totals
+        if ply < random_plies:
+            move = rng.choice(position.get_moves())
+        else:
+            move, seconds, nodes = players[position.turn].choose_move(position, tables[position.turn])
+            total = totals[position.turn]
+            total[0] += 1
+            total[1] += seconds
+            total[2] += nodes
+        position = position.play(move)
+    return None, totals
+
+
+def _play_match_game(args):
+    index, first, second, random_plies, seed, max_plies = args
+    # Players swap colors every game; `first` is WHITE in even games.
+    white, red = (first, second) if index % 2 == 0 else (second, first)
+    winner, totals = play_game({WHITE: white, RED: red}, random_plies, seed, max_plies)
+    first_side = WHITE if index % 2 == 0 else RED
+    second_side = RED if first_side == WHITE else WHITE
+    if winner is None:
+        result = 'draw'
+    else:
+        result = 'win' if winner == first_side else 'loss'
+    return result, totals[first_side], totals[second_side]
+
+def run_match(first, second, games, jobs=1, random_plies=2, seed=0, max_plies=MAX_PLIES):
+    # Returns a summary dict from `first`'s point of view. Consecutive games
+    # share a random opening with colors swapped.
+    tasks = [(i, first, second, random_plies, seed + i // 2, max_plies) for i in range(games)]
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(_play_match_game, tasks))
+    else:
+        results = [_play_match_game(task) for task in tasks]
+
+    summary = {'win': 0, 'draw': 0, 'loss': 0}
+    totals = [[0, 0.0, 0], [0, 0.0, 0]]
+    for result, *player_totals in results:
+        summary[result] += 1
+        for total, game_total in zip(totals, player_totals):
+            for i, value in enumerate(game_total):
+                total[i] += value
+    for name, player, (moves, seconds, nodes) in zip(('first', 'second'), (first, second), totals):
+        summary[name] = {
+            'player': str(player),
+            'moves': moves,
+            'avg_move_time': seconds / moves if moves else 0.0,
+            'nodes_per_second': nodes / seconds if seconds else 0.0,
+        }
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play engine-vs-engine checkers games without a display.")
+    parser.add_argument('first', type=Player.parse, help="player spec, e.g. alphabeta:time=0.5")
+    parser.add_argument('second', type=Player.parse, help="player spec, e.g. minimax:depth=3")
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--jobs', type=int, default=1, help="games played in parallel")
+    parser.add_argument('--random-plies', type=int, default=2,
+                        help="random opening plies so repeated games differ")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-plies', type=int, default=MAX_PLIES)
+    args = parser.parse_args(argv)
+
+    summary = run_match(args.first, args.second, args.games, args.jobs,
+                        args.random_plies, args.seed, args.max_plies)
+    print(f"{summary['first']['player']} vs {summary['second']['player']}: "
+          f"+{summary['win']} ={summary['draw']} -{summary['loss']}")
+    for name in ('first', 'second'):
+        stats = summary[name]
+        print(f"  {stats['player']}: {stats['moves']} moves, "
+              f"{stats['avg_move_time'] * 1000:.1f} ms/move, "
+              f"{stats['nodes_per_second']:,.0f} nodes/s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import signal
+import sys
+import time
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+
+import engine
+from bitboard import Position, WHITE, RED, bits, bit_to_square, pdn_notation
+from book import open_book
+from checkers import Constants
+
+# Headless game server: many games at once over JSON lines on a local TCP
+# or Unix socket, all sharing one pool of engine processes.
+#
+#   python server.py --port 8765 --workers 4
+#   python server.py --unix /tmp/checkers.sock
+#
+# Requests are one JSON object per line and answered in order, each reply
+# echoing the request's "id":
+#   {"op": "new", "ai": "alphabeta", "time": 0.5, "ai_first": false}
+#   {"op": "move", "game": 1, "move": "11-15"}  the human's move; the reply
+#                                               carries the AI's answer
+#   {"op": "state", "game": 1}
+#   {"op": "close", "game": 1}
+#   {"op": "stats"}                             latency percentiles per game and
+#                                               over the last LATENCY_WINDOW moves
+# Positions are sent as PDN FEN and moves in PDN notation, and every reply
+# about a game lists the legal moves for the side to move.
+#
+# At most --workers AI searches run at once. Up to --queue more wait for a
+# worker; past that a move is turned away as busy. Each connection is read
+# one request at a time, so a client sending faster than it is answered is
+# held back by its socket. A move's time budget counts from when the request
+# arrived, so time spent queueing comes out of the search.
+
+DEFAULT_TIME = 0.5  # Seconds per AI move unless the game asks otherwise
+MAX_TIME = 10.0
+MIN_SEARCH_TIME = 0.05  # Search time left to a move however long it queued
+LATENCY_WINDOW = 10000  # AI moves, across all games, that the overall latency figures cover
+
+
+class RequestError(Exception):
+    pass
+
+
+def fen(position):
+    # PDN FEN, e.g. "B:W18,24,K27:B12,16": side to move, then each side's
+    # squares, kings prefixed with K. RED is Black in PDN.
+    sides = []
+    for letter, mask in (('W', position.white), ('B', position.red)):
+        squares = sorted((32 - bit_to_square(b), b & position.kings) for b in bits(mask))
+        sides.append(letter + ','.join(f"{'K' if king else ''}{n}" for n, king in squares))
+    return ':'.join(['B' if position.turn == RED else 'W'] + sides)
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of a non-empty list.
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def latency_summary(latencies):
+    if not latencies:
+        return {'count': 0}
+    return {'count': len(latencies), 'p50': percentile(latencies, 0.5),
+            'p90': percentile(latencies, 0.9), 'p99': percentile(latencies, 0.99),
+            'max': max(latencies)}
+
+
+class ServerGame:
+
+    def __init__(self, number, ai, time_limit, ai_side):
+        self.number = number
+        self.ai = ai
+        self.time_limit = time_limit
+        self.ai_side = ai_side
+        self.position = Position()
+        self.moves = []      # moves played, in PDN notation
+        self.latencies = []  # seconds from each move request to the AI's reply
+        self.lock = asyncio.Lock()  # one move at a time, whichever connection sends it
+
+    def result(self):
+        # 'white' or 'red' once the game is over, else None.
+        if engine.children(self.position) is not None:
+            return None
+        return 'white' if self.position.winner() == Constants.WHITE else 'red'
+
+    def state(self):
+        result = self.result()
+        return {'game': self.number, 'fen': fen(self.position), 'ply': len(self.moves),
+                'turn': 'red' if self.position.turn == RED else 'white', 'result': result,
+                'legal': [] if result else [pdn_notation(m) for m in self.position.get_moves()]}
+
+    def play(self, move):
+        self.position = self.position.play(move)
+        self.moves.append(pdn_notation(move))
+
+
+class GameServer:
+
+    def __init__(self, executor, workers, queue=64, max_games=1000, book=None, batched=False):
+        self.executor = executor
+        self.slots = asyncio.Semaphore(workers)
+        self.queue = queue
+        self.max_games = max_games
+        self.book = book
+        self.batched = batched
+        self.games = {}
+        self.numbers = itertools.count(1)
+        self.waiting = 0    # searches queued for a worker
+        self.running = 0    # searches in the pool
+        self.searches = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)  # every game's, kept after games close
+        self.connections = set()  # handler tasks of the open connections
+
+    async def handle(self, reader, writer):
+        # One connection: answer requests in order until the client hangs up.
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):  # line over the stream limit, reset
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                reply = await self.respond(line, time.perf_counter())
+                writer.write(json.dumps(reply).encode() + b'\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):  # cancelled by close_connections
+            pass
+        finally:
+            self.connections.discard(task)
+            writer.close()
+
+    async def close_connections(self):
+        # At shutdown: stop every connection's handler, including any waiting
+        # on a search, and wait until all of them have closed.
+        tasks = list(self.connections)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def respond(self, line, received):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError("Request must be a JSON object")
+            request_id = request.get('id')
+            handler = getattr(self, f"op_{request.get('op')}", None)
+            if handler is None:
+                raise RequestError(f"Unknown op {request.get('op')!r}")
+            reply = await handler(request, received)
+            reply['ok'] = True
+        except (RequestError, ValueError, TypeError) as e:
+            reply = {'ok': False, 'error': str(e)}
+        if request_id is not None:
+            reply['id'] = request_id
+        return reply
+
+    def _game(self, request):
+        game = self.games.get(request.get('game'))
+        if game is None:
+            raise RequestError(f"No game {request.get('game')!r}")
+        return game
+
+    async def op_new(self, request, received):
+        ai = request.get('ai', 'alphabeta')
+        if ai not in engine.AI_TYPES:
+            raise RequestError(f"Unknown ai {ai!r}, expected one of {', '.join(engine.AI_TYPES)}")
+        time_limit = float(request.get('time', DEFAULT_TIME))
+        if not 0 < time_limit <= MAX_TIME:
+            raise RequestError(f"time must be in (0, {MAX_TIME}]")
+        if len(self.games) >= self.max_games:
+            raise RequestError("Too many games")
+        game = ServerGame(next(self.numbers), ai, time_limit,
+                          RED if request.get('ai_first') else WHITE)
+        self.games[game.number] = game
+        reply = {}
+        if game.ai_side == RED:
+            async with game.lock:
+                try:
+                    reply = await self._ai_move(game, received)
+                except RequestError:
+                    del self.games[game.number]
+                    raise
+        reply.update(game.state())
+        return reply
+
+    async def op_move(self, request, received):
+        game = self._game(request)
+        if game.lock.locked():
+            raise RequestError("The AI is still thinking")
+        async with game.lock:
+            if game.result() is not None:
+                raise RequestError("The game is over")
+            if game.position.turn == game.ai_side:
+                raise RequestError("Not your turn")
+            legal = {pdn_notation(m): m for m in game.position.get_moves()}
+            move = legal.get(request.get('move'))
+            if move is None:
+                raise RequestError(f"Illegal move {request.get('move')!r}")
+            previous = game.position
+            game.play(move)
+            reply = {}
+            if game.result() is None:
+                try:
+                    reply = await self._ai_move(game, received)
+                except RequestError:
+                    # Take the human's move back so the client can send it again
+                    game.position = previous
+                    game.moves.pop()
+                    raise
+            reply.update(game.state())
+            return reply
+
+    async def op_state(self, request, received):
+        game = self._game(request)
+        state = game.state()
+        state['moves'] = game.moves
+        return state
+
+    async def op_close(self, request, received):
+        game = self._game(request)
+        del self.games[game.number]
+        return {'game': game.number, 'latency': latency_summary(game.latencies)}
+
+    async def op_stats(self, request, received):
+        return {
+            'games': {number: latency_summary(game.latencies) for number, game in self.games.items()},
+            'latency': latency_summary(self.latencies),
+            'running': self.running, 'waiting': self.waiting,
+            'searches': self.searches, 'rejected': self.rejected,
+        }
+
+    async def _ai_move(self, game, received):
+        # Plays the AI's move in game and returns the reply fields about it.
+        position = game.position
+        entry = None
+        if self.book is not None and game.ai != 'minimax':
+            entry = self.book.probe(position)
+        if entry is not None:
+            move, score, depth, nodes = entry[0], entry[1], entry[2], 0
+        else:
+            if self.waiting >= self.queue:
+                self.rejected += 1
+                raise RequestError("Server busy, try again")
+            self.waiting += 1
+            try:
+                await self.slots.acquire()
+            finally:
+                self.waiting -= 1
+            self.running += 1
+            try:
+                time_limit = max(game.time_limit - (time.perf_counter() - received), MIN_SEARCH_TIME)
+                move, score, depth, nodes = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, engine.search_in_worker, position, engine.AI_TYPES[game.ai],
+                    time_limit, self.batched)
+            except BrokenProcessPool:
+                raise RequestError("Engine pool failed")
+            except Exception as e:  # e.g. --batched without NumPy; the caller rolls back
+                raise RequestError(f"Engine error: {e}")
+            finally:
+                self.running -= 1
+                self.slots.release()
+            self.searches += 1
+        game.play(move)
+        latency = time.perf_counter() - received
+        game.latencies.append(latency)
+        self.latencies.append(latency)
+        return {'ai_move': pdn_notation(move), 'score': score, 'depth': depth, 'nodes': nodes,
+                'latency': latency}
+
+
+async def serve(args):
+    executor = engine.make_pool(args.workers, args.table_mb, args.tablebase)
+    server = GameServer(executor, args.workers, args.queue, args.max_games,
+                        open_book(args.book), args.batched)
+    if args.unix:
+        listener = await asyncio.start_unix_server(server.handle, path=args.unix)
+        address = args.unix
+    else:
+        listener = await asyncio.start_server(server.handle, args.host, args.port)
+        address = f"{args.host}:{args.port}"
+    print(f"Serving on {address} with {args.workers} engine workers", file=sys.stderr)
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            asyncio.get_running_loop().add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):  # Windows: Ctrl+C raises KeyboardInterrupt
+            pass
+    try:
+        async with listener:
+            await stop.wait()
+            listener.close()  # no new connections while the open ones close
+            await server.close_connections()
+    finally:
+        executor.shutdown(cancel_futures=True)
+        summary = latency_summary(server.latencies)
+        if summary['count']:
+            print(f"Last {summary['count']} AI moves: latency p50 {summary['p50']:.3f}s "
+                  f"p90 {summary['p90']:.3f}s p99 {summary['p99']:.3f}s", file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve many checkers games over JSON lines.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="listen on this Unix socket path instead of TCP")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="engine processes shared by all games")
+    parser.add_argument('--queue', type=int, default=64,
+                        help="AI moves that may wait for a worker before new ones are turned away")
+    parser.add_argument('--max-games', type=int, default=1000)
+    parser.add_argument('--table-mb', type=int, default=engine.WORKER_TT_MB,
+                        help="transposition table size per worker")
+    parser.add_argument('--book', default='opening.book')
+    parser.add_argument('--tablebase', default='endgame.tb')
+    parser.add_argument('--batched', action=argparse.BooleanOptionalAction, default=False,
+                        help="use the NumPy batched evaluation (slower per position)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import json
+import time
+
+# Counters collected by every search (see engine.SearchContext.stats).
+
+
+class SearchStats:
+
+    def __init__(self):
+        self.nodes = 0          # nodes entered, leaves included
+        self.leaves = 0         # static evaluations at depth 0 or game over
+        self.expanded = 0       # interior nodes whose moves were generated
+        self.generated = 0      # moves generated at those nodes
+        self.cutoffs = []       # beta cutoffs by index of the move that caused them
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_cutoffs = 0
+        self.tb_hits = 0        # positions resolved by the endgame tablebase
+        self.q_nodes = 0        # quiescence (capture-only) nodes, part of nodes
+        self.q_exhausted = 0    # quiescence nodes scored as they stand: node budget used up
+        self.pvs_researches = 0         # PVS moves searched again after beating the null window
+        self.aspiration_researches = 0  # root searches repeated with a wider aspiration window
+        self.iterations = []    # one entry per completed iterative-deepening depth
+        self.start = None       # perf_counter() when iterative deepening started
+        self.seconds = None     # its total time, unfinished iteration included, once done
+
+    def count_cutoff(self, index):
+        while len(self.cutoffs) <= index:
+            self.cutoffs.append(0)
+        self.cutoffs[index] += 1
+
+    def record_iteration(self, depth, seconds, score, pv):
+        self.iterations.append({'depth': depth, 'seconds': seconds, 'nodes': self.nodes,
+                                'score': score, 'pv': pv})
+
+    def elapsed(self):
+        # Search time so far, or in total once the search is over: the time
+        # every counted node was searched in.
+        if self.seconds is not None:
+            return self.seconds
+        return time.perf_counter() - self.start if self.start is not None else 0.0
+
+    @property
+    def branching_factor(self):
+        return self.generated / self.expanded if self.expanded else 0.0
+
+    @property
+    def first_move_cutoff_rate(self):
+        # Share of cutoffs caused by the first move tried: a measure of
+        # move-ordering quality.
+        total = sum(self.cutoffs)
+        return self.cutoffs[0] / total if total else 0.0
+
+    def to_dict(self):
+        seconds = self.elapsed()
+        return {
+            'nodes': self.nodes,
+            'leaves': self.leaves,
+            'seconds': seconds,
+            'nodes_per_second': self.nodes / seconds if seconds else 0.0,
+            'branching_factor': self.branching_factor,
+            'cutoffs_by_move': self.cutoffs,
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'tt_cutoffs': self.tt_cutoffs,
+            'tb_hits': self.tb_hits,
+            'q_nodes': self.q_nodes,
+            'q_exhausted': self.q_exhausted,
+            'pvs_researches': self.pvs_researches,
+            'aspiration_researches': self.aspiration_researches,
+            'depth': self.iterations[-1]['depth'] if self.iterations else 0,
+            'pv': self.iterations[-1]['pv'] if self.iterations else [],
+            'iterations': self.iterations,
+        }
+
+    def summary(self):
+        # Short lines for the GUI overlay.
+        info = self.to_dict()
+        hit_rate = self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+        tablebase = f"  TB {self.tb_hits:,}" if self.tb_hits else ""
+        return [
+            f"Depth {info['depth']}  {self.nodes:,} nodes ({self.q_nodes / (self.nodes or 1):.0%} quiescence)",
+            f"{info['nodes_per_second']:,.0f} nodes/s  BF {self.branching_factor:.1f}",
+            f"TT hits {hit_rate:.0%}  1st-move cuts {self.first_move_cutoff_rate:.0%}{tablebase}",
+            "PV " + " ".join(info['pv'][:6]),
+        ]
+
+    def write_jsonl(self, path, **extra):
+        # Append one JSON object per search, e.g. one line per AI move.
+        record = dict(extra, **self.to_dict())
+        with open(path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
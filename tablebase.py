@@ -0,0 +1,305 @@
+import argparse
+import heapq
+import mmap
+import struct
+import sys
+import time
+from itertools import combinations
+from math import comb
+
+from bitboard import Position, WHITE, RED, SQUARES, WHITE_KING_ROW, RED_KING_ROW, bits, bit_to_square
+from checkers import Constants
+
+# Endgame tablebase: the exact result of every position with few pieces,
+# found by retrograde analysis and probed by the search.
+#
+#   python tablebase.py build --pieces 3 -o endgame.tb
+#   python tablebase.py info endgame.tb
+#
+# Positions are split into slices by material signature (white men, white
+# kings, red men, red kings). Captures and promotions always lead to a
+# slice with fewer pieces or fewer men, so slices are solved in that order
+# and every move out of a slice looks up an already solved one.
+#
+# Within a slice a position's index is built from the combinatorial rank of
+# each group of pieces (white men, red men, white kings, red kings) among
+# the squares the earlier groups left free, times two for the side to move.
+# Each index holds one byte, from the side to move's point of view:
+#   0          draw (or an index no legal position maps to)
+#   1 + d      win, d plies from the end of the game (d < 127)
+#   128 + d    loss, d plies from the end of the game
+#
+# File layout: a header (magic, version, max pieces, slice count), a slice
+# directory of (signature, offset), then each slice's bytes.
+
+MAGIC = b'CKTB'
+VERSION = 1
+HEADER = struct.Struct('<4sHHI')
+SLICE = struct.Struct('<BBBBQ')
+
+WIN, DRAW, LOSS = 1, 0, -1
+MAX_DISTANCE = 126
+WIN_SCORE = 1000  # Search score of a won position, less its distance
+
+
+def signature(position):
+    kings = position.kings
+    return ((position.white & ~kings).bit_count(), (position.white & kings).bit_count(),
+            (position.red & ~kings).bit_count(), (position.red & kings).bit_count())
+
+def slice_size(sig):
+    white_men, white_kings, red_men, red_kings = sig
+    size, free = 2, SQUARES
+    for count in (white_men, red_men, white_kings, red_kings):
+        size *= comb(free, count)
+        free -= count
+    return size
+
+def index(position):
+    kings = position.kings
+    occupied = 0
+    free = SQUARES
+    result = 0
+    for group in (position.white & ~kings, position.red & ~kings,
+                  position.white & kings, position.red & kings):
+        rank = 0
+        for i, b in enumerate(bits(group)):
+            # Square number among the squares still free, i.e. not taken
+            # by an earlier group.
+            rank += comb(bit_to_square(b) - (occupied & (b - 1)).bit_count(), i + 1)
+        count = group.bit_count()
+        result = result * comb(free, count) + rank
+        occupied |= group
+        free -= count
+    return result * 2 + position.turn
+
+def encode(result, distance):
+    if distance > MAX_DISTANCE:
+        raise ValueError(f"Distance {distance} does not fit the tablebase format")
+    if result == WIN:
+        return 1 + distance
+    elif result == LOSS:
+        return 128 + distance
+    return 0
+
+def decode(value):
+    # Returns (result, distance) for the side to move.
+    if value == 0:
+        return DRAW, 0
+    elif value < 128:
+        return WIN, value - 1
+    return LOSS, value - 128
+
+def signatures(pieces):
+    # Every material signature with 2..pieces pieces and at least one piece
+    # per side, in solving order.
+    found = []
+    for white_men in range(pieces):
+        for white_kings in range(pieces - white_men):
+            for red_men in range(pieces - white_men - white_kings + 1):
+                for red_kings in range(pieces - white_men - white_kings - red_men + 1):
+                    if white_men + white_kings and red_men + red_kings:
+                        found.append((white_men, white_kings, red_men, red_kings))
+    found.sort(key=lambda sig: (sum(sig), sig[0] + sig[2]))
+    return found
+
+
+def _placements(sig):
+    # Every (white, red, kings) placement for a signature. Men never stand on
+    # their own promotion row.
+    white_men, white_kings, red_men, red_kings = sig
+    squares = [1 << s for s in range(SQUARES)]
+    for wm in combinations([b for b in squares if not b & WHITE_KING_ROW], white_men):
+        wm = sum(wm)
+        for rm in combinations([b for b in squares if not b & (RED_KING_ROW | wm)], red_men):
+            rm = sum(rm)
+            for wk in combinations([b for b in squares if not b & (wm | rm)], white_kings):
+                wk = sum(wk)
+                for rk in combinations([b for b in squares if not b & (wm | rm | wk)], red_kings):
+                    rk = sum(rk)
+                    yield wm | wk, rm | rk, wk | rk
+
+def _terminal(position):
+    # (result, 0) for the side to move if the game is over, else None.
+    winner = position.winner()
+    if winner is None:
+        return None
+    mover = Constants.WHITE if position.turn == WHITE else Constants.RED
+    return (WIN if winner == mover else LOSS), 0
+
+def solve_slice(sig, solved):
+    # Retrograde analysis of one slice. `solved` maps the signatures solved
+    # so far to their values. Results are finalized in order of distance
+    # (a Dijkstra-style sweep), so wins get the shortest distance and losses
+    # the longest.
+    values = bytearray(slice_size(sig))
+    nodes = []
+    ids = {}
+    for white, red, kings in _placements(sig):
+        for turn in (WHITE, RED):
+            position = Position(white, red, kings, turn)
+            ids[index(position)] = len(nodes)
+            nodes.append(position)
+
+    count = len(nodes)
+    parents = [[] for _ in range(count)]
+    pending = [0] * count       # children in this slice not yet resolved
+    best_win = [None] * count   # shortest win found so far
+    longest_loss = [0] * count  # longest loss over resolved children
+    has_draw = [False] * count
+    queue = []
+    for node, position in enumerate(nodes):
+        terminal = _terminal(position)
+        if terminal is not None:
+            heapq.heappush(queue, (0, node, terminal[0]))
+            continue
+        for move in position.get_moves():
+            child = position.play(move)
+            result = _terminal(child)
+            if result is None:
+                child_sig = signature(child)
+                if child_sig == sig:
+                    parents[ids[index(child)]].append(node)
+                    pending[node] += 1
+                    continue
+                result = decode(solved[child_sig][index(child)])
+            child_result, distance = result
+            if child_result == LOSS:
+                if best_win[node] is None or distance + 1 < best_win[node]:
+                    best_win[node] = distance + 1
+            elif child_result == WIN:
+                longest_loss[node] = max(longest_loss[node], distance + 1)
+            else:
+                has_draw[node] = True
+        if best_win[node] is not None:
+            heapq.heappush(queue, (best_win[node], node, WIN))
+        elif not pending[node] and not has_draw[node]:
+            heapq.heappush(queue, (longest_loss[node], node, LOSS))
+
+    done = [False] * count
+    while queue:
+        distance, node, result = heapq.heappop(queue)
+        if done[node]:
+            continue
+        done[node] = True
+        values[index(nodes[node])] = encode(result, distance)
+        for parent in parents[node]:
+            if done[parent]:
+                continue
+            if result == LOSS:
+                if best_win[parent] is None or distance + 1 < best_win[parent]:
+                    best_win[parent] = distance + 1
+                    heapq.heappush(queue, (distance + 1, parent, WIN))
+            else:
+                pending[parent] -= 1
+                longest_loss[parent] = max(longest_loss[parent], distance + 1)
+                if not pending[parent] and best_win[parent] is None and not has_draw[parent]:
+                    heapq.heappush(queue, (longest_loss[parent], parent, LOSS))
+    # Positions never resolved can avoid losing forever: draws, stored as 0.
+    return values
+
+def build_tablebase(path, pieces=3, log=None):
+    solved = {}
+    start = time.perf_counter()
+    for sig in signatures(pieces):
+        solved[sig] = solve_slice(sig, solved)
+        if log:
+            log(f"{sig}: {len(solved[sig])} positions, {time.perf_counter() - start:.0f}s")
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, pieces, len(solved)))
+        offset = HEADER.size + SLICE.size * len(solved)
+        for sig, values in solved.items():
+            f.write(SLICE.pack(*sig, offset))
+            offset += len(values)
+        for values in solved.values():
+            f.write(values)
+    return solved
+
+
+class Tablebase:
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise ValueError(f"{path} is not an endgame tablebase")
+        magic, version, pieces, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} endgame tablebase")
+        self.pieces = pieces
+        self.slices = {}
+        for i in range(count):
+            *sig, offset = SLICE.unpack_from(self._map, HEADER.size + i * SLICE.size)
+            self.slices[tuple(sig)] = offset
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def probe(self, position):
+        # (result, distance) for the side to move, or None if the position
+        # has too many pieces.
+        if (position.white | position.red).bit_count() > self.pieces:
+            return None
+        if not position.white or not position.red:
+            # Game over: whoever still has pieces has won.
+            own = position.white if position.turn == WHITE else position.red
+            return (WIN if own else LOSS), 0
+        offset = self.slices.get(signature(position))
+        if offset is None:
+            return None
+        return decode(self._map[offset + index(position)])
+
+    def score(self, position):
+        # Search score from WHITE's point of view: +/-(WIN_SCORE - distance)
+        # so faster wins and slower losses are preferred, 0 for a draw.
+        entry = self.probe(position)
+        if entry is None:
+            return None
+        result, distance = entry
+        if result == DRAW:
+            return 0
+        score = WIN_SCORE - distance
+        return score if (result == WIN) == (position.turn == WHITE) else -score
+
+def open_tablebase(path):
+    # The tablebase is optional: a missing or unreadable file means none.
+    try:
+        return Tablebase(path)
+    except (OSError, ValueError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect a checkers endgame tablebase.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="solve every position with up to --pieces pieces")
+    build.add_argument('-o', '--output', default='endgame.tb')
+    build.add_argument('--pieces', type=int, default=3)
+    info = commands.add_parser('info', help="summarize a tablebase file")
+    info.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        solved = build_tablebase(args.output, args.pieces,
+                                 log=lambda message: print(message, file=sys.stderr))
+        print(f"Wrote {len(solved)} slices to {args.output}")
+    else:
+        tablebase = Tablebase(args.path)
+        print(f"{args.path}: up to {tablebase.pieces} pieces, {len(tablebase.slices)} slices")
+        data = tablebase._map
+        for sig, offset in sorted(tablebase.slices.items()):
+            values = data[offset:offset + slice_size(sig)]
+            wins = sum(1 for v in values if 0 < v < 128)
+            losses = sum(1 for v in values if v >= 128)
+            longest = max((decode(v)[1] for v in values if v), default=0)
+            print(f"  {sig}: {len(values):>9} entries, {wins:>8} wins, {losses:>8} losses, "
+                  f"longest {longest} plies")
+        tablebase.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+# Fixed-size transposition table indexed by Position.key (Zobrist).
+#
+# Each bucket holds two entries: a depth-preferred slot that keeps the
+# deepest result of the current search, and an always-replace slot that takes
+# everything else. Entries are (key, depth, flag, score, move, generation)
+# tuples; scores are from WHITE's point of view like the rest of the engine.
+
+EXACT = 0
+LOWER = 1   # score is a lower bound (the search failed high)
+UPPER = 2   # score is an upper bound (the search failed low)
+
+# Rough CPython cost of one stored entry (tuple, key, score and move refs).
+ENTRY_BYTES = 160
+
+
+class TranspositionTable:
+
+    def __init__(self, size_mb=16):
+        buckets = 1
+        while buckets * 4 * ENTRY_BYTES <= size_mb * 1024 * 1024:
+            buckets *= 2
+        self.mask = buckets - 1
+        self.entries = [None] * (2 * buckets)
+        self.generation = 0
+
+    def new_search(self):
+        # Entries from earlier searches stay probeable but lose their claim
+        # on the depth-preferred slot.
+        self.generation += 1
+
+    def clear(self):
+        self.entries = [None] * len(self.entries)
+        self.generation = 0
+
+    def probe(self, key):
+        index = (key & self.mask) << 1
+        entry = self.entries[index]
+        if entry is not None and entry[0] == key:
+            return entry
+        entry = self.entries[index + 1]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        index = (key & self.mask) << 1
+        entry = (key, depth, flag, score, move, self.generation)
+        current = self.entries[index]
+        if (current is None or current[0] == key or depth >= current[1] or
+                current[5] != self.generation):
+            self.entries[index] = entry
+        else:
+            self.entries[index + 1] = entry
+
+    def best_move(self, key):
+        entry = self.probe(key)
+        return entry[4] if entry is not None else None